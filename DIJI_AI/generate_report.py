@@ -4,6 +4,7 @@ import os
 os.environ['CURL_CA_BUNDLE'] = ''
 
 import sys
+import time
 import pandas as pd
 import json
 import requests
@@ -12,6 +13,9 @@ import requests
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.find_similar_issues import IssueFinder
+from src.hybrid_search import HybridSearcher, load_retrieval_config
+from src.reranker import CrossEncoderReranker, load_reranker_config
+from embedding_cache.cache import get_embedding_cache
 from sentence_transformers import SentenceTransformer
 
 def generate_llm_analysis(new_issue, similar_issues_df, **kwargs):
@@ -63,7 +67,8 @@ def generate_rag_report(issue_details, output_file):
     """
     base_dir = os.path.dirname(__file__)
     index_file = os.path.join(base_dir, 'vector_index', 'diji_ai.index')
-    mapping_file = os.path.join(base_dir, 'vector_index', 'data_mapping.pkl')
+    mapping_file = os.path.join(base_dir, 'vector_index', 'data_mapping')
+    bm25_dir = os.path.join(base_dir, 'vector_index', 'bm25')
 
     if not os.path.exists(index_file):
         report_content = "Error: Vector index not found. Please run `src/build_vector_index.py` first."
@@ -74,9 +79,30 @@ def generate_rag_report(issue_details, output_file):
         model = SentenceTransformer('all-MiniLM-L6-v2')
 
         # 1. Retrieve: Find similar issues
-        finder = IssueFinder(index_file, mapping_file, model)
+        finder = IssueFinder(index_file, mapping_file, model,
+                             embedding_cache=get_embedding_cache('all-MiniLM-L6-v2'))
         query_text = issue_details['Summary'] + " " + issue_details['Comments']
-        similar_issues = finder.find_similar(query_text, k=3)
+        retrieval_params = load_retrieval_config()
+        reranker_params = load_reranker_config()
+        # Retrieve many cheaply, then let the cross-encoder pick the few for the prompt.
+        k = reranker_params["candidates"] if reranker_params["enabled"] else 3
+        retrieve_start = time.perf_counter()
+        if retrieval_params["hybrid"] and os.path.exists(bm25_dir):
+            # BM25 catches exact tokens (error codes, module names) that dense search blurs.
+            searcher = HybridSearcher(finder, bm25_dir, retrieval_params)
+            similar_issues = searcher.search(query_text, k=k)
+        else:
+            if retrieval_params["hybrid"]:
+                print("BM25 index not found, using vector search only. Rebuild the index to enable hybrid search.")
+            if reranker_params["enabled"]:
+                similar_issues = finder.df_map.loc(finder.search(query_text, k=k)[1])
+            else:
+                similar_issues = finder.find_similar(query_text, k=k)
+        print(f"Retrieval: {len(similar_issues)} candidates in {(time.perf_counter() - retrieve_start) * 1000:.1f} ms")
+
+        if reranker_params["enabled"]:
+            reranker = CrossEncoderReranker(reranker_params)
+            similar_issues = reranker.rerank(query_text, similar_issues, k=3)
         
         # 2. Augment & Generate: Get analysis from LLM
         report_content = generate_llm_analysis(issue_details, similar_issues)
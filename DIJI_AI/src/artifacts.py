@@ -0,0 +1,333 @@
+import os
+import sys
+import json
+import time
+import threading
+import yaml
+
+sys.path.append(os.path.dirname(__file__))
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+config_path = os.path.join(project_root, "config.yaml")
+# Written by retrain.py after a successful run; a change tells running
+# processes to hot-swap the artifacts whose files changed.
+published_path = os.path.join(project_root, "cache", "artifacts_published.json")
+
+
+def _file_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def _rss_bytes():
+    # Resident set size from /proc on Linux; None elsewhere.
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def estimate_bytes(value):
+    """
+    Approximate memory held by a loaded artifact, or None if unknown.
+    """
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if hasattr(value, "count_params"):
+        # Keras model: weights only.
+        return int(sum(w.size * w.dtype.itemsize for w in value.get_weights()))
+    if hasattr(value, "ntotal") and hasattr(value, "d"):
+        # FAISS index: raw vectors; compressed (PQ) indexes hold less.
+        return int(value.ntotal) * int(value.d) * 4
+    return None
+
+
+class _Entry:
+    __slots__ = ("value", "signature", "load_seconds", "loaded_at", "bytes")
+
+
+class ArtifactRegistry:
+    """
+    Thread-safe registry of lazily loaded, memoized artifacts.
+
+    Each artifact is registered with a loader and the files it is read from.
+    The first get() loads it, concurrent first calls wait for a single load,
+    and later calls return the cached object without locking.
+
+    When retrain.py publishes new artifacts, changed ones are reloaded in a
+    background thread and swapped in together; callers keep using the old
+    objects until the new ones are ready.
+    """
+
+    def __init__(self, check_interval_s=5.0):
+        self._loaders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._name_locks = {}
+        self.check_interval_s = check_interval_s
+        self._published = self._read_published()
+        self._last_check = time.monotonic()
+        self._refreshing = False
+
+    def register(self, name, loader, paths=()):
+        """
+        Registers loader() for name. paths may be a list or a callable
+        returning one, and is used to detect changed files on refresh.
+        """
+        with self._lock:
+            self._loaders[name] = (loader, paths)
+            self._name_locks.setdefault(name, threading.Lock())
+
+    def _paths(self, name):
+        paths = self._loaders[name][1]
+        return list(paths() if callable(paths) else paths)
+
+    def _load(self, name):
+        loader = self._loaders[name][0]
+        entry = _Entry()
+        entry.signature = _file_signature(self._paths(name))
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        entry.value = loader()
+        entry.load_seconds = time.perf_counter() - start
+        entry.loaded_at = time.time()
+        entry.bytes = estimate_bytes(entry.value)
+        if entry.bytes is None and rss_before is not None:
+            entry.bytes = max(_rss_bytes() - rss_before, 0)
+        print(f"Loaded artifact '{name}' in {entry.load_seconds:.2f}s")
+        return entry
+
+    def get(self, name):
+        self._maybe_refresh()
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry.value
+        if name not in self._loaders:
+            raise KeyError(f"Unknown artifact '{name}'. Registered: {sorted(self._loaders)}")
+        with self._name_locks[name]:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._load(name)
+                with self._lock:
+                    self._entries[name] = entry
+        return entry.value
+
+    def get_many(self, *names):
+        """
+        Returns several artifacts from the same published version, e.g. a
+        model together with the tokenizer it was trained with.
+        """
+        for name in names:
+            self.get(name)
+        with self._lock:
+            return tuple(self._entries[name].value for name in names)
+
+    def is_loaded(self, name):
+        return name in self._entries
+
+    def warm_up(self, names=None):
+        """
+        Loads the given artifacts (default: all registered) now, so the first
+        request does not pay for them. Returns {name: error} for failures.
+        """
+        errors = {}
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                errors[name] = e
+                print(f"Could not load artifact '{name}': {e}")
+        return errors
+
+    def memory_report(self):
+        """
+        Returns {name: {"bytes", "load_seconds", "loaded_at"}} for loaded artifacts.
+        """
+        return {name: {"bytes": entry.bytes, "load_seconds": entry.load_seconds, "loaded_at": entry.loaded_at}
+                for name, entry in list(self._entries.items())}
+
+    def print_memory_report(self):
+        print(f"{'artifact':<20}{'MB':>10}{'load s':>10}")
+        for name, info in sorted(self.memory_report().items()):
+            size = f"{info['bytes'] / 1024 ** 2:.1f}" if info["bytes"] is not None else "?"
+            print(f"{name:<20}{size:>10}{info['load_seconds']:>10.2f}")
+
+    def refresh(self, names=None):
+        """
+        Reloads loaded artifacts whose files changed since they were loaded
+        (or the given names) and swaps them in together. Returns the names
+        that were reloaded.
+        """
+        if names is None:
+            names = [name for name, entry in list(self._entries.items())
+                     if _file_signature(self._paths(name)) != entry.signature]
+        fresh = {}
+        for name in names:
+            with self._name_locks[name]:
+                fresh[name] = self._load(name)
+        with self._lock:
+            self._entries.update(fresh)
+        return list(fresh)
+
+    def unload(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def _read_published(self):
+        try:
+            with open(published_path, 'r') as f:
+                return json.load(f).get("version")
+        except (OSError, ValueError):
+            return None
+
+    def _maybe_refresh(self):
+        # Unlocked fast path; get() only takes the lock once per check interval.
+        if self.check_interval_s is None or time.monotonic() - self._last_check < self.check_interval_s:
+            return
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._last_check < self.check_interval_s:
+                return
+            self._last_check = time.monotonic()
+            published = self._read_published()
+            if published == self._published:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                reloaded = self.refresh()
+                # Recorded only once the swap succeeded, so a failed one is retried at the next check.
+                with self._lock:
+                    self._published = published
+                if reloaded:
+                    print(f"Hot-swapped artifacts published at {published}: {', '.join(reloaded)}")
+            except Exception as e:
+                print(f"Hot-swap of published artifacts failed, keeping the loaded ones: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+        threading.Thread(target=run, daemon=True).start()
+
+
+def atomic_write(path, write_fn):
+    """
+    Calls write_fn(tmp_path) and renames the result over path, so a lazy
+    load during a retrain sees either the old file or the new one, never a
+    half-written one. The temporary name keeps the extension, which Keras
+    and np.save rely on.
+    """
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def publish():
+    """
+    Marks the artifacts on disk as a new version. Called by retrain.py once
+    every stage has succeeded.
+    """
+    os.makedirs(os.path.dirname(published_path), exist_ok=True)
+    tmp_path = published_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": time.time(), "published_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+    os.replace(tmp_path, published_path)
+
+
+# --- Shared DIJI_AI artifacts ---
+
+registry = ArtifactRegistry()
+
+
+def _load_config():
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def config():
+    return registry.get("config")
+
+
+def config_section(name, defaults):
+    """
+    Copy of defaults updated with the config.yaml section name, which may be
+    missing or partial.
+    """
+    params = dict(defaults)
+    params.update(config().get(name) or {})
+    return params
+
+
+def artifact_path(key, default=None):
+    """
+    Absolute path of config['paths'][key].
+    """
+    return os.path.join(project_root, config()["paths"].get(key, default))
+
+
+def _load_cnn_model():
+    from tensorflow.keras.models import load_model
+    return load_model(artifact_path("cnn_model"))
+
+
+def _joblib_loader(key):
+    def load():
+        import joblib
+        return joblib.load(artifact_path(key))
+    return load
+
+
+def _load_lite_predictor():
+    from lite_predict import LitePredictor
+    return LitePredictor(artifact_path("tflite_model", "cnn_model.tflite"),
+                         artifact_path("vocabulary", "tokenizer_vocab.json"),
+                         num_threads=(config().get("serving") or {}).get("num_threads"))
+
+
+def _faiss_index_path():
+    return os.path.join(project_root, "vector_index", "diji_ai.index")
+
+
+def _load_faiss_index():
+    import faiss
+    from index_factory import load_index_config, set_search_params
+    index = faiss.read_index(_faiss_index_path())
+    set_search_params(index, load_index_config())
+    return index
+
+
+def _load_historical_data():
+    import pandas as pd
+    return pd.read_csv(artifact_path("raw_data"))
+
+
+def _examples_index_path():
+    return artifact_path("examples_index", "data/root_cause_examples.json")
+
+
+def _load_examples_index():
+    sys.path.append(os.path.dirname(project_root))
+    from examples_index.index import load_or_build
+    return load_or_build(_examples_index_path(), artifact_path("raw_data"),
+                         target_column=config()["cnn_model"]["target_column"])
+
+
+registry.register("config", _load_config, [config_path])
+registry.register("cnn_model", _load_cnn_model, lambda: [artifact_path("cnn_model")])
+registry.register("tokenizer", _joblib_loader("tokenizer"), lambda: [artifact_path("tokenizer")])
+registry.register("label_encoder", _joblib_loader("label_encoder"), lambda: [artifact_path("label_encoder")])
+registry.register("lite_predictor", _load_lite_predictor,
+                  lambda: [artifact_path("tflite_model", "cnn_model.tflite"),
+                           artifact_path("vocabulary", "tokenizer_vocab.json")])
+registry.register("faiss_index", _load_faiss_index, lambda: [_faiss_index_path()])
+registry.register("historical_data", _load_historical_data, lambda: [artifact_path("raw_data")])
+registry.register("examples_index", _load_examples_index, lambda: [_examples_index_path()])
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import argparse
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+from index_factory import INDEX_TYPES, load_index_config, build_index, sample_for_training, reconstruct_all
+
+
+def recall_at_k(ground_truth, found, k):
+    """
+    Fraction of the exact top-k neighbours that the candidate index returned.
+    """
+    hits = 0
+    for truth_row, found_row in zip(ground_truth[:, :k], found[:, :k]):
+        hits += len(set(truth_row) & set(found_row))
+    return hits / ground_truth[:, :k].size
+
+
+def time_single_queries(index, queries, k):
+    """
+    Searches one query at a time, as IssueFinder does, and returns per-query latencies in ms.
+    """
+    latencies = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        index.search(queries[i:i + 1], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def benchmark(index_path, index_types, k=10, num_queries=1000, seed=42):
+    """
+    Compares approximate index types against an exact flat index built from
+    the embeddings already stored in index_path.
+
+    A random sample of the stored vectors is held out as queries and the rest
+    is indexed, so the numbers are not inflated by exact self-matches.
+    """
+    print(f"Loading embeddings from {index_path}...")
+    _, embeddings = reconstruct_all(faiss.read_index(index_path))
+    d = embeddings.shape[1]
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(embeddings))
+    num_queries = min(num_queries, len(embeddings) // 10 or 1)
+    queries = embeddings[order[:num_queries]]
+    corpus = embeddings[order[num_queries:]]
+    ids = np.arange(len(corpus), dtype='int64')
+    print(f"Corpus: {len(corpus)} vectors, {num_queries} held-out queries, d={d}, k={k}")
+
+    base_params = load_index_config()
+    results = []
+    ground_truth = None
+    for index_type in ["flat"] + [t for t in index_types if t != "flat"]:
+        params = dict(base_params, type=index_type)
+
+        start = time.perf_counter()
+        index = build_index(d, params, sample_for_training(corpus, params))
+        index.add_with_ids(corpus, ids)
+        build_seconds = time.perf_counter() - start
+
+        _, found = index.search(queries, k)
+        if ground_truth is None:
+            ground_truth = found
+
+        latencies = time_single_queries(index, queries, k)
+        results.append({
+            "type": index_type,
+            "recall": recall_at_k(ground_truth, found, k),
+            "p50_ms": np.percentile(latencies, 50),
+            "p99_ms": np.percentile(latencies, 99),
+            "memory_mb": faiss.serialize_index(index).nbytes / 1024 ** 2,
+            "build_s": build_seconds,
+        })
+
+    print(f"\n{'index':<10}{'recall@' + str(k):>12}{'p50 ms':>10}{'p99 ms':>10}{'memory MB':>12}{'build s':>10}")
+    for r in results:
+        print(f"{r['type']:<10}{r['recall']:>12.4f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['memory_mb']:>12.1f}{r['build_s']:>10.1f}")
+    return results
+
+
+if __name__ == '__main__':
+    current_dir = os.path.dirname(__file__)
+    base_dir = os.path.abspath(os.path.join(current_dir, '..'))
+
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types for IssueFinder.")
+    parser.add_argument("--index", default=os.path.join(base_dir, 'vector_index', 'diji_ai.index'),
+                        help="A flat index built by build_vector_index.py, used as the source of embeddings.")
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        print("Error: Index file not found.")
+        print("Please run `build_vector_index.py` with `type: flat` first to create the index.")
+    else:
+        benchmark(args.index, args.types, k=args.k, num_queries=args.queries)
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from preprocess import combine_fields, combine_fields_frame, preprocess_csv
+
+WORDS = ["service", "timeout", "NullRef", "database", "Login", "cache", "PAYMENT", "gateway",
+         "retry", "error", "deadlock", "config", "mismatch", "restart", "memory", "leak"]
+APPLICATIONS = ["Inventory Service", "Order Management", "MobileApp", "Billing", "Auth Service"]
+ROOT_CAUSES = ["Code Defect", "Configuration Issue", "Infrastructure", "Data Issue", "Third Party"]
+
+
+def make_synthetic_defects(path, rows, seed=42):
+    """
+    Writes a synthetic raw defect export with HTML tags, irregular whitespace,
+    missing values and long comments, i.e. everything clean_text has to handle.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+
+    def sentences(n, length):
+        picked = words[rng.integers(0, len(words), size=(n, length))]
+        return [" ".join(w) for w in picked]
+
+    summaries = sentences(rows, 8)
+    comments = [f"<p>{c}</p>\n\t  <b>{c.upper()}</b>  " * 12 for c in sentences(rows, 10)]
+    error_codes = rng.integers(100, 600, size=rows).astype(float)
+    error_codes[rng.random(rows) < 0.05] = np.nan
+
+    df = pd.DataFrame({
+        "Defect_ID": [f"DEF-{i}" for i in range(rows)],
+        "Summary": summaries,
+        "Comments": comments,
+        "Error_Code": error_codes,
+        "Severity": rng.choice(["low", "medium", "high"], size=rows),
+        "Application": rng.choice(APPLICATIONS, size=rows),
+        "Root_Cause": rng.choice(ROOT_CAUSES, size=rows),
+    })
+    df.loc[rng.random(rows) < 0.02, "Comments"] = np.nan
+    df.to_csv(path, index=False)
+
+
+def preprocess_csv_rowwise(input_path, output_path, target_column="Root_Cause"):
+    """
+    The previous implementation of preprocess_csv, kept as the baseline.
+    """
+    df = pd.read_csv(input_path)
+    df["text"] = df.apply(combine_fields, axis=1)
+    df[["text", target_column]].to_csv(output_path, index=False)
+
+
+def benchmark(rows):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_path = os.path.join(tmp_dir, "raw.csv")
+        rowwise_path = os.path.join(tmp_dir, "rowwise.csv")
+        vectorized_path = os.path.join(tmp_dir, "vectorized.csv")
+
+        print(f"Generating {rows} synthetic defects...")
+        make_synthetic_defects(raw_path, rows)
+
+        start = time.perf_counter()
+        preprocess_csv_rowwise(raw_path, rowwise_path)
+        rowwise_seconds = time.perf_counter() - start
+
+        # Without build_examples, so the real examples index is left alone and not timed.
+        start = time.perf_counter()
+        preprocess_csv(raw_path, vectorized_path)
+        vectorized_seconds = time.perf_counter() - start
+
+        with open(rowwise_path, 'rb') as a, open(vectorized_path, 'rb') as b:
+            identical = a.read() == b.read()
+
+        # Also compare the text column alone, without the CSV round trip.
+        df = pd.read_csv(raw_path, nrows=10_000)
+        assert df.apply(combine_fields, axis=1).equals(combine_fields_frame(df)), "combine_fields_frame differs"
+
+    print(f"\n{'implementation':<16}{'seconds':>10}{'rows/sec':>14}")
+    print(f"{'row-wise apply':<16}{rowwise_seconds:>10.2f}{rows / rowwise_seconds:>14,.0f}")
+    print(f"{'vectorized':<16}{vectorized_seconds:>10.2f}{rows / vectorized_seconds:>14,.0f}")
+    print(f"Speed-up: {rowwise_seconds / vectorized_seconds:.1f}x")
+    print(f"Output byte-identical: {identical}")
+    return identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row-wise and vectorized preprocessing.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    sys.exit(0 if benchmark(args.rows) else 1)
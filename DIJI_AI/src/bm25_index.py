@@ -0,0 +1,117 @@
+import os
+import re
+import sys
+import json
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+from mapping_store import save_array
+
+# Keeps codes such as "npe-001", "module_xyz286" and "10.2.1" as single tokens,
+# since they are often what identifies a duplicate defect.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+# On-disk layout of a BM25 index directory:
+#   meta.json      k1, b, document count and the term list (term id = position)
+#   ids.npy        FAISS id of every document, so both retrievers share ids
+#   indptr.npy     CSR row pointers: postings of term t are [indptr[t]:indptr[t + 1]]
+#   docs.npy       document positions of the postings
+#   weights.npy    precomputed BM25 weight of every posting
+# The weights are final BM25 term scores, so a query only sums postings.
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def build_bm25_index(texts, ids, index_dir, k1=1.5, b=0.75):
+    """
+    Builds an inverted BM25 index over texts, one document per FAISS id,
+    and writes it to index_dir.
+    """
+    ids = np.asarray(ids, dtype='int64')
+    vocabulary = {}
+    term_ids, doc_positions, term_counts, doc_lengths = [], [], [], np.zeros(len(ids), dtype='float32')
+    for position, text in enumerate(texts):
+        tokens = tokenize(text)
+        doc_lengths[position] = len(tokens)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            doc_positions.append(position)
+            term_counts.append(count)
+
+    term_ids = np.asarray(term_ids, dtype='int64')
+    doc_positions = np.asarray(doc_positions, dtype='int64')
+    tf = np.asarray(term_counts, dtype='float32')
+
+    # Group the postings by term.
+    order = np.argsort(term_ids, kind='stable')
+    term_ids, doc_positions, tf = term_ids[order], doc_positions[order], tf[order]
+    doc_freq = np.bincount(term_ids, minlength=len(vocabulary))
+    indptr = np.zeros(len(vocabulary) + 1, dtype='int64')
+    np.cumsum(doc_freq, out=indptr[1:])
+
+    n = len(ids)
+    idf = np.log1p((n - doc_freq + 0.5) / (doc_freq + 0.5)).astype('float32')
+    avg_length = float(doc_lengths.mean()) if n else 0.0
+    norm = k1 * (1 - b + b * doc_lengths[doc_positions] / max(avg_length, 1e-9))
+    weights = idf[term_ids] * tf * (k1 + 1) / (tf + norm)
+
+    os.makedirs(index_dir, exist_ok=True)
+    save_array(os.path.join(index_dir, "ids.npy"), ids)
+    save_array(os.path.join(index_dir, "indptr.npy"), indptr)
+    save_array(os.path.join(index_dir, "docs.npy"), doc_positions.astype('int32'))
+    save_array(os.path.join(index_dir, "weights.npy"), weights.astype('float32'))
+
+    terms = [None] * len(vocabulary)
+    for token, term_id in vocabulary.items():
+        terms[term_id] = token
+    meta = {"k1": k1, "b": b, "documents": n, "terms": terms}
+    tmp_meta = os.path.join(index_dir, "meta.json.tmp")
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, os.path.join(index_dir, "meta.json"))
+    print(f"BM25 index with {n} documents and {len(terms)} terms saved to {index_dir}")
+
+
+class BM25Index:
+    """
+    Memory-mapped BM25 index written by `build_bm25_index`.
+    """
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, "meta.json"), 'r') as f:
+            meta = json.load(f)
+        self.term_ids = {term: i for i, term in enumerate(meta["terms"])}
+        self.ids = np.load(os.path.join(index_dir, "ids.npy"), mmap_mode='r')
+        self.indptr = np.load(os.path.join(index_dir, "indptr.npy"), mmap_mode='r')
+        self.docs = np.load(os.path.join(index_dir, "docs.npy"), mmap_mode='r')
+        self.weights = np.load(os.path.join(index_dir, "weights.npy"), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k=50):
+        """
+        Returns (scores, ids) of the k best matching documents, best first.
+        Only the postings of the query terms are read.
+        """
+        # A repeated query term counts once per occurrence, as in classic BM25.
+        term_ids = [self.term_ids[t] for t in tokenize(query) if t in self.term_ids]
+        if not term_ids:
+            return np.empty(0, dtype='float32'), np.empty(0, dtype='int64')
+
+        docs = np.concatenate([self.docs[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+        weights = np.concatenate([self.weights[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+        positions, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype('float32')
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return scores[top], np.asarray(self.ids[positions[top]])
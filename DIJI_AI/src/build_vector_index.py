@@ -3,14 +3,34 @@ import pandas as pd
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
-import pickle
+import hashlib
+import json
 import os
+import sys
 os.environ['CURL_CA_BUNDLE'] = ''
 
-def create_and_save_index(data_path, index_save_path, data_mapping_save_path, model_name='all-MiniLM-L6-v2'):
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from artifacts import atomic_write
+from embedding_cache.cache import get_embedding_cache
+from index_factory import load_index_config, build_index, needs_training, sample_for_training, supports_removal
+from mapping_store import save_mapping
+from bm25_index import build_bm25_index
+
+# 'text' is the Summary + Comments string that was embedded and BM25-indexed.
+MAPPING_COLUMNS = ['Defect_ID', 'Summary', 'Root_Cause', 'text']
+
+def create_and_save_index(data_path, index_save_path, data_mapping_save_path, model_name='all-MiniLM-L6-v2',
+                          manifest_path=None, bm25_save_path=None):
     """
     Loads issue data, creates sentence embeddings, builds a FAISS index,
     and saves the index and data mapping to disk.
+
+    When bm25_save_path is given, a BM25 index over the same text and FAISS
+    ids is written there for hybrid search.
+
+    When manifest_path is given, a fresh manifest is written as well so that
+    later runs of `update_index` can continue from this full build.
     """
     print("Loading data...")
     try:
@@ -34,30 +54,192 @@ def create_and_save_index(data_path, index_save_path, data_mapping_save_path, mo
 
     print("Generating embeddings for the issue text...")
     # The model will output a 384-dimensional vector for 'all-MiniLM-L6-v2'
-    embeddings = model.encode(df['text'].tolist(), show_progress_bar=True)
+    # Texts embedded by an earlier run (or another project) come from the cache.
+    embedding_cache = get_embedding_cache(model_name)
+    embeddings = embedding_cache.encode(model, df['text'].tolist(), show_progress_bar=True)
+    print(f"Embedding cache: {embedding_cache.stats()}")
 
     # FAISS requires the embeddings to be in a specific float32 format.
     embeddings = np.array(embeddings).astype('float32')
     
     d = embeddings.shape[1]  # Dimensionality of the vectors
     
-    print(f"Building FAISS index with {d} dimensions...")
-    index = faiss.IndexFlatL2(d)
-    index.add(embeddings)
+    params = load_index_config()
+    print(f"Building '{params['type']}' FAISS index with {d} dimensions...")
+    index = build_index(d, params, sample_for_training(embeddings, params))
+    # FAISS ids are row positions in the saved data mapping.
+    index.add_with_ids(embeddings, np.arange(len(embeddings), dtype='int64'))
 
     print(f"Saving FAISS index to {index_save_path}...")
-    faiss.write_index(index, index_save_path)
+    atomic_write(index_save_path, lambda p: faiss.write_index(index, p))
 
-    # Save the original data (or at least the IDs) to map index results back to defects
-    # We'll save the entire dataframe for now for easy lookup
-    df_to_save = df[['Defect_ID', 'Summary', 'Root_Cause']].reset_index(drop=True)
+    # Save the columns needed to map index results back to defects, plus the
+    # embedded text, which the reranker scores. The mapping is memory-mapped at
+    # query time rather than unpickled.
+    df_to_save = df[MAPPING_COLUMNS].reset_index(drop=True)
     
     print(f"Saving data mapping to {data_mapping_save_path}...")
-    with open(data_mapping_save_path, 'wb') as f:
-        pickle.dump(df_to_save, f)
+    save_mapping(df_to_save, data_mapping_save_path)
+
+    if bm25_save_path:
+        build_bm25_index(df['text'].tolist(), np.arange(len(df), dtype='int64'), bm25_save_path)
+
+    if manifest_path:
+        rows = {}
+        for i, (defect_id, text) in enumerate(zip(df['Defect_ID'], df['text'])):
+            rows[str(defect_id)] = {"id": i, "hash": _content_hash(text)}
+        manifest = {"model_name": model_name, "index_type": params["type"], "next_id": len(df), "rows": rows}
+        print(f"Saving index manifest to {manifest_path}...")
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
 
     print("Vector index and data mapping have been successfully created.")
 
+def _content_hash(text):
+    """
+    Returns a stable fingerprint of the text that is embedded for a defect.
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _load_manifest(manifest_path, model_name, index_type):
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        manifest.setdefault("index_type", "flat")
+        return manifest
+    # 'rows' maps Defect_ID -> {"id": FAISS id, "hash": content hash}
+    return {"model_name": model_name, "index_type": index_type, "next_id": 0, "rows": {}}
+
+def _save_checkpoint(index, manifest, index_save_path, manifest_path):
+    # The index is written before the manifest. If a run dies in between, the
+    # manifest still holds the old hashes, so the affected rows are simply
+    # re-embedded (remove + add by id) on the next run.
+    atomic_write(index_save_path, lambda p: faiss.write_index(index, p))
+
+    def write_manifest(p):
+        with open(p, 'w') as f:
+            json.dump(manifest, f)
+    atomic_write(manifest_path, write_manifest)
+
+def update_index(data_path, index_save_path, data_mapping_save_path, manifest_path,
+                 model_name='all-MiniLM-L6-v2', batch_size=1024, bm25_save_path=None):
+    """
+    Incrementally brings the FAISS index in line with the issue data.
+
+    Rows are keyed by Defect_ID and a hash of their text, so only new or edited
+    defects are embedded. Edited and deleted defects are replaced or removed
+    through an ID-mapped index. Progress is checkpointed after every batch so
+    an interrupted run resumes where it stopped. The BM25 index, if any, is
+    rebuilt from the text; that needs no model and takes seconds.
+    """
+    print("Loading data...")
+    try:
+        df = pd.read_csv(data_path)
+    except FileNotFoundError:
+        print(f"Error: The file {data_path} was not found.")
+        return
+
+    df['text'] = df['Summary'].fillna('') + " " + df['Comments'].fillna('')
+    df = df[df['text'].str.strip().astype(bool)].copy()
+
+    # The last occurrence of a Defect_ID wins, as in a re-exported row.
+    df['key'] = df['Defect_ID'].astype(str)
+    df = df.drop_duplicates(subset='key', keep='last').reset_index(drop=True)
+    df['content_hash'] = df['text'].map(_content_hash)
+
+    params = load_index_config()
+    if not supports_removal(params):
+        print(f"Error: A '{params['type']}' index cannot replace or remove defects.")
+        print("Run a full rebuild with `create_and_save_index` instead.")
+        return
+
+    manifest = _load_manifest(manifest_path, model_name, params["type"])
+    if manifest["model_name"] != model_name or manifest["index_type"] != params["type"]:
+        print(f"Error: The index was built as a '{manifest['index_type']}' index with "
+              f"'{manifest['model_name']}', not a '{params['type']}' index with '{model_name}'.")
+        print("Run a full rebuild with `create_and_save_index` to switch models or index types.")
+        return
+    rows = manifest["rows"]
+
+    index = None
+    if rows and os.path.exists(index_save_path):
+        print(f"Loading existing FAISS index from {index_save_path}...")
+        index = faiss.read_index(index_save_path)
+
+    current_keys = set(df['key'])
+    deleted = [key for key in rows if key not in current_keys]
+    known_hashes = df['key'].map(lambda key: rows.get(key, {}).get("hash"))
+    pending = df[df['content_hash'] != known_hashes]
+
+    print(f"{len(pending)} new or edited defects, {len(deleted)} deleted defects.")
+
+    if deleted:
+        deleted_ids = np.array([rows[key]["id"] for key in deleted], dtype='int64')
+        if index is not None:
+            index.remove_ids(deleted_ids)
+        for key in deleted:
+            del rows[key]
+
+    if not pending.empty:
+        print(f"Loading sentence transformer model: {model_name}...")
+        model = SentenceTransformer(model_name)
+        embedding_cache = get_embedding_cache(model_name)
+
+    start = 0
+    while start < len(pending):
+        # A fresh IVF index is trained on its first batch, so make that one big enough.
+        size = batch_size
+        if index is None and needs_training(params):
+            size = max(batch_size, params["train_sample_size"])
+        batch = pending.iloc[start:start + size]
+        print(f"Embedding defects {start + 1}-{start + len(batch)} of {len(pending)}...")
+        embeddings = embedding_cache.encode(model, batch['text'].tolist())
+        start += len(batch)
+
+        if index is None:
+            index = build_index(embeddings.shape[1], params, embeddings)
+
+        ids = []
+        for key, content_hash in zip(batch['key'], batch['content_hash']):
+            entry = rows.get(key)
+            if entry is None:
+                entry = {"id": manifest["next_id"]}
+                manifest["next_id"] += 1
+            entry["hash"] = content_hash
+            rows[key] = entry
+            ids.append(entry["id"])
+        ids = np.array(ids, dtype='int64')
+
+        # Drop any previous vector for these ids before adding the new ones.
+        index.remove_ids(ids)
+        index.add_with_ids(embeddings, ids)
+        _save_checkpoint(index, manifest, index_save_path, manifest_path)
+
+    if index is None:
+        print("No text data found to index after cleaning. Aborting.")
+        return
+
+    if pending.empty:
+        if not deleted:
+            if not bm25_save_path or os.path.exists(bm25_save_path):
+                print("Vector index is already up to date.")
+                return
+        else:
+            _save_checkpoint(index, manifest, index_save_path, manifest_path)
+
+    # The mapping is indexed by FAISS id, so search results can be looked up
+    # by id regardless of how often rows were replaced or removed.
+    df_to_save = df[MAPPING_COLUMNS].copy()
+    df_to_save.index = df['key'].map(lambda key: rows[key]["id"]).values
+
+    print(f"Saving data mapping to {data_mapping_save_path}...")
+    save_mapping(df_to_save, data_mapping_save_path)
+
+    if bm25_save_path:
+        build_bm25_index(df['text'].tolist(), df_to_save.index.to_numpy(), bm25_save_path)
+
+    print(f"Vector index updated. It now holds {index.ntotal} defects.")
+
 if __name__ == '__main__':
     # Assuming the script is in DIJI_AI/src and data is in DIJI_AI/data
     # Adjust paths as necessary
@@ -71,6 +253,12 @@ if __name__ == '__main__':
     os.makedirs(index_dir, exist_ok=True)
     
     index_file = os.path.join(index_dir, 'diji_ai.index')
-    mapping_file = os.path.join(index_dir, 'data_mapping.pkl')
+    mapping_file = os.path.join(index_dir, 'data_mapping')
+    manifest_file = os.path.join(index_dir, 'manifest.json')
+    bm25_dir = os.path.join(index_dir, 'bm25')
 
-    create_and_save_index(data_file, index_file, mapping_file)
+    if '--incremental' in sys.argv:
+        update_index(data_file, index_file, mapping_file, manifest_file, bm25_save_path=bm25_dir)
+    else:
+        create_and_save_index(data_file, index_file, mapping_file, manifest_path=manifest_file,
+                              bm25_save_path=bm25_dir)
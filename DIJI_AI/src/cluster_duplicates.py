@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import argparse
+import faiss
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+sys.path.append(os.path.dirname(__file__))
+from artifacts import config_section
+from index_factory import reconstruct_all
+from mapping_store import MappingStore
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+
+DEFAULT_DEDUP_PARAMS = {
+    "threshold": 0.95,          # Cosine similarity above which two defects are duplicates
+    "chunk_size": 10000,        # Queries per range_search call
+    "exact_max_rows": 50000,    # Above this, search an IVF index instead of all pairs
+    "nlist": None,              # IVF lists; default 4 * sqrt(n)
+    "nprobe": 16,               # IVF lists visited per query
+    "output": "data/duplicate_clusters.csv",
+}
+
+
+def load_dedup_config():
+    return config_section("deduplication", DEFAULT_DEDUP_PARAMS)
+
+
+def build_search_index(embeddings, params):
+    """
+    Inner-product index over normalized embeddings, so range_search radii are
+    cosine similarities. Small corpora are searched exactly; larger ones go
+    through IVF, which keeps the all-pairs search well below quadratic time.
+    """
+    n, d = embeddings.shape
+    if n <= params["exact_max_rows"]:
+        index = faiss.IndexFlatIP(d)
+    else:
+        nlist = params["nlist"] or int(4 * np.sqrt(n))
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        rng = np.random.default_rng(42)
+        sample = embeddings[rng.choice(n, min(n, nlist * 39), replace=False)]
+        print(f"Training IVF{nlist} on {len(sample)} vectors...")
+        index.train(sample)
+        index.nprobe = params["nprobe"]
+    index.add(embeddings)
+    return index
+
+
+def find_duplicate_pairs(index, embeddings, threshold, chunk_size):
+    """
+    Runs range_search for every embedding in chunks and returns the (i, j)
+    row pairs with i < j whose similarity exceeds threshold.
+    """
+    rows, cols = [], []
+    for start in range(0, len(embeddings), chunk_size):
+        lims, _, neighbors = index.range_search(embeddings[start:start + chunk_size], threshold)
+        queries = start + np.repeat(np.arange(len(lims) - 1), np.diff(lims))
+        # Each pair is found from both ends; keep one direction and drop self-matches.
+        keep = queries < neighbors
+        rows.append(queries[keep])
+        cols.append(neighbors[keep])
+        print(f"Searched {min(start + chunk_size, len(embeddings))}/{len(embeddings)} defects...")
+    if not rows:
+        return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def cluster_duplicates(index_path, mapping_path, output_path=None, params=None):
+    """
+    Groups near-duplicate defects using the embeddings stored in the FAISS
+    index written by build_vector_index.py.
+
+    Defects are linked when their cosine similarity is above the threshold,
+    and each connected group of links is one cluster. Writes Defect_ID,
+    cluster_id and cluster_size for every defect; singletons have size 1.
+    """
+    params = params or load_dedup_config()
+    output_path = output_path or os.path.join(project_root, params["output"])
+    timings = {}
+
+    start = time.perf_counter()
+    ids, embeddings = reconstruct_all(faiss.read_index(index_path))
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    faiss.normalize_L2(embeddings)
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = build_search_index(embeddings, params)
+    timings["index"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows, cols = find_duplicate_pairs(index, embeddings, params["threshold"], params["chunk_size"])
+    timings["range_search"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n = len(embeddings)
+    graph = coo_matrix((np.ones(len(rows), dtype='int8'), (rows, cols)), shape=(n, n))
+    num_clusters, labels = connected_components(graph, directed=False)
+    sizes = np.bincount(labels)
+    timings["cluster"] = time.perf_counter() - start
+
+    mapping = MappingStore(mapping_path)
+    positions = mapping.positions(ids)
+    results = pd.DataFrame({
+        "Defect_ID": [mapping.value("Defect_ID", p) for p in positions],
+        "cluster_id": labels,
+        "cluster_size": sizes[labels],
+    })
+    results.sort_values(["cluster_size", "cluster_id"], ascending=[False, True], kind='stable').to_csv(
+        output_path, index=False)
+
+    duplicates = int((sizes[labels] > 1).sum())
+    print(f"\n{n} defects, {len(rows)} duplicate pairs above similarity {params['threshold']}, "
+          f"{int((sizes > 1).sum())} clusters covering {duplicates} defects "
+          f"({duplicates - int((sizes > 1).sum())} removable).")
+    print(f"Search: {'exact' if n <= params['exact_max_rows'] else 'IVF, nprobe=' + str(params['nprobe'])}")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<14}{seconds:>8.2f}s")
+    print(f"  {'total':<14}{sum(timings.values()):>8.2f}s")
+    print(f"Cluster assignments saved to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate defects in the vector index.")
+    parser.add_argument("--threshold", type=float, help="Cosine similarity; overrides deduplication.threshold.")
+    parser.add_argument("--output", help="CSV path; overrides deduplication.output.")
+    args = parser.parse_args()
+
+    dedup_params = load_dedup_config()
+    if args.threshold is not None:
+        dedup_params["threshold"] = args.threshold
+
+    index_dir = os.path.join(project_root, 'vector_index')
+    cluster_duplicates(os.path.join(index_dir, 'diji_ai.index'), os.path.join(index_dir, 'data_mapping'),
+                       output_path=args.output, params=dedup_params)
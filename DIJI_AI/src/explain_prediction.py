@@ -1,13 +1,11 @@
-import joblib
-import yaml
 import os
+import sys
 import numpy as np
-from predict import predict, combine_fields
+import scipy.sparse as sp
 
-# Load config and model
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
-config = yaml.safe_load(open(config_path))
-model = joblib.load(config["paths"]["model"])
+sys.path.append(os.path.dirname(__file__))
+from preprocess import combine_fields
+from artifacts import registry, config, artifact_path
 
 # Mock issue for testing
 mock_issue = {
@@ -18,45 +16,90 @@ mock_issue = {
     "Application": "MobileApp"
 }
 
-def explain_prediction(issue: dict):
-    # Get the top prediction
-    predictions = predict(issue)
-    top_prediction_label = predictions[0][0]
+class TfidfExplainer:
+    """
+    Explains a TF-IDF + linear classifier pipeline ('tfidf' and 'clf' steps).
 
-    print(f"Prediction: {top_prediction_label}")
-    print("-" * 20)
+    The feature names and the coefficient matrix are read once. Each batch
+    is vectorized once and explained directly on the sparse CSR rows; no
+    dense copy of the TF-IDF vectors is made.
+    """
+
+    def __init__(self, pipeline):
+        self.vectorizer = pipeline.named_steps['tfidf']
+        classifier = pipeline.named_steps['clf']
+        self.classes = np.asarray(classifier.classes_)
+        self.feature_names = self.vectorizer.get_feature_names_out()
+
+        coef = classifier.coef_
+        coef = coef.toarray() if sp.issparse(coef) else np.asarray(coef)
+        intercept = np.atleast_1d(np.asarray(classifier.intercept_, dtype=float))
+        if coef.shape[0] == 1:
+            # Binary models store one row for the positive class (classes_[1]).
+            coef = np.vstack([-coef, coef])
+            intercept = np.concatenate([-intercept, intercept])
+        self.coef = coef
+        self.intercept = intercept
+
+    def explain_batch(self, issues, top_k=10, labels=None):
+        """
+        Returns, for every issue, (label, [(term, contribution), ...]) with up
+        to top_k terms present in the issue that push towards the label.
 
-    # Extract vectorizer and classifier from pipeline
-    vectorizer = model.named_steps['tfidf']
-    classifier = model.named_steps['clf']
+        Without labels, each issue is explained for the class the linear model
+        predicts. That class comes from the same sparse vectors, so there is no
+        separate predict() pass.
+        """
+        X = self.vectorizer.transform([combine_fields(issue) for issue in issues]).tocsr()
+        n = X.shape[0]
 
-    # Find the index of the predicted class
-    class_index = np.where(classifier.classes_ == top_prediction_label)[0][0]
+        if labels is None:
+            scores = np.asarray(X @ self.coef.T) + self.intercept
+            class_indices = scores.argmax(axis=1)
+        else:
+            lookup = {label: i for i, label in enumerate(self.classes)}
+            class_indices = np.array([lookup[label] for label in labels], dtype='int64')
 
-    # Get the coefficients for that class
-    class_coefficients = classifier.coef_[class_index]
+        # One entry per (issue, present term), scored with the coefficient of
+        # that issue's class, as in the single-issue explanation.
+        row_ids = np.repeat(np.arange(n), np.diff(X.indptr))
+        contributions = self.coef[class_indices[row_ids], X.indices]
 
-    # Get feature names from the vectorizer
-    feature_names = vectorizer.get_feature_names_out()
+        # Sort within each row by descending contribution, then keep the
+        # first top_k positive entries of every row.
+        order = np.lexsort((-contributions, row_ids))
+        rank = np.arange(len(order)) - X.indptr[row_ids[order]]
+        keep = order[(rank < top_k) & (contributions[order] > 0)]
 
-    # Transform the issue text to see which features are present
-    text = combine_fields(issue)
-    transformed_text = vectorizer.transform([text])
-    present_features_indices = transformed_text.toarray()[0].nonzero()[0]
+        explanations = [[] for _ in range(n)]
+        for row, feature, contribution in zip(row_ids[keep], X.indices[keep], contributions[keep]):
+            explanations[row].append((self.feature_names[feature], float(contribution)))
+        return [(self.classes[c], terms) for c, terms in zip(class_indices, explanations)]
 
-    # Get the coefficients for the features present in the text
-    present_coefficients = class_coefficients[present_features_indices]
-    present_feature_names = feature_names[present_features_indices]
+def _load_explainer():
+    import joblib
+    if not config()["paths"].get("model"):
+        raise RuntimeError("No TF-IDF pipeline configured. Set paths.model in config.yaml.")
+    return TfidfExplainer(joblib.load(artifact_path("model")))
 
-    # Sort features by their coefficient value
-    sorted_indices = np.argsort(present_coefficients)[::-1]
+registry.register("tfidf_explainer", _load_explainer,
+                  lambda: [artifact_path("model")] if config()["paths"].get("model") else [])
+
+def get_explainer():
+    """
+    Loads the TF-IDF pipeline from config['paths']['model'] on first use.
+    """
+    return registry.get("tfidf_explainer")
+
+def explain_prediction(issue: dict, label=None):
+    label, terms = get_explainer().explain_batch([issue], labels=None if label is None else [label])[0]
+
+    print(f"Prediction: {label}")
+    print("-" * 20)
 
     print("Top words/phrases contributing to this prediction:")
-    for i in sorted_indices[:10]: # Print top 10
-        feature = present_feature_names[i]
-        coeff = present_coefficients[i]
-        if coeff > 0:
-            print(f"  - '{feature}' (Contribution: {coeff:.2f})")
+    for feature, coeff in terms:
+        print(f"  - '{feature}' (Contribution: {coeff:.2f})")
 
 if __name__ == "__main__":
     explain_prediction(mock_issue)
@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import yaml
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from artifacts import atomic_write
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+config_path = os.path.join(project_root, "config.yaml")
+with open(config_path, 'r') as f:
+    config = yaml.safe_load(f)
+
+
+def _path(key, default):
+    return os.path.join(project_root, config["paths"].get(key, default))
+
+
+def export_vocabulary(tokenizer, label_encoder, vocabulary_path, max_length):
+    """
+    Dumps what LiteTokenizer needs to reproduce the Keras tokenizer, plus the
+    label names, so serving needs neither Keras nor scikit-learn.
+    """
+    num_words = tokenizer.num_words
+    # Words at or above num_words are always mapped to OOV, so they are not needed.
+    word_index = {w: i for w, i in tokenizer.word_index.items() if not num_words or i < num_words}
+    vocabulary = {
+        "word_index": word_index,
+        "num_words": num_words,
+        "oov_token": tokenizer.oov_token,
+        "filters": tokenizer.filters,
+        "lower": tokenizer.lower,
+        "split": tokenizer.split,
+        "max_length": max_length,
+        "labels": [str(label) for label in label_encoder.classes_],
+    }
+    def write_vocabulary(path):
+        with open(path, 'w') as f:
+            json.dump(vocabulary, f)
+    atomic_write(vocabulary_path, write_vocabulary)
+
+
+def export_tflite(quantization=None, representative_samples=200):
+    """
+    Converts the trained Keras CNN to TFLite and writes the JSON vocabulary.
+
+    quantization: None or "none" (float32), "dynamic" (int8 weights, float
+    activations) or "int8" (int8 weights and activations, calibrated on cached
+    training sequences). Token-id inputs and probability outputs keep float types.
+    """
+    import tensorflow as tf
+    from train import sequence_cache_key
+
+    params = config["cnn_model"]
+    quantization = None if quantization == "none" else quantization
+    model = tf.keras.models.load_model(_path("cnn_model", "cnn_model.keras"))
+    tokenizer = joblib.load(_path("tokenizer", "tokenizer.joblib"))
+    label_encoder = joblib.load(_path("label_encoder", "label_encoder.joblib"))
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        processed_data_path = _path("processed_data", "data/processed_data.csv")
+        cache_dir = _path("sequence_cache", "cache/sequences")
+        X = np.load(os.path.join(cache_dir, sequence_cache_key(processed_data_path, params), "X.npy"), mmap_mode='r')
+        input_dtype = model.inputs[0].dtype.as_numpy_dtype
+        rng = np.random.default_rng(42)
+        sample = rng.choice(len(X), min(representative_samples, len(X)), replace=False)
+
+        def representative_dataset():
+            for i in sample:
+                yield [np.asarray(X[i:i + 1], dtype=input_dtype)]
+        converter.representative_dataset = representative_dataset
+
+    tflite_path = _path("tflite_model", "cnn_model.tflite")
+    tflite_model = converter.convert()
+
+    def write_tflite(path):
+        with open(path, 'wb') as f:
+            f.write(tflite_model)
+    atomic_write(tflite_path, write_tflite)
+    vocabulary_path = _path("vocabulary", "tokenizer_vocab.json")
+    export_vocabulary(tokenizer, label_encoder, vocabulary_path, params["max_length"])
+
+    print(f"TFLite model ({quantization or 'float32'}) saved to {tflite_path} "
+          f"({os.path.getsize(tflite_path) / 1024 ** 2:.1f} MB)")
+    print(f"Vocabulary saved to {vocabulary_path}")
+    return tflite_path, vocabulary_path
+
+
+def _startup_seconds(code):
+    # A fresh interpreter per backend, so import and load costs are included.
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(__file__),
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def verify_export(num_samples=500, batch_size=1):
+    """
+    Checks that the TFLite model reproduces the Keras top-3 labels on
+    processed data, and compares startup time and per-batch latency.
+    """
+    import tensorflow as tf
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+    from lite_predict import LitePredictor
+
+    params = config["cnn_model"]
+    texts = pd.read_csv(_path("processed_data", "data/processed_data.csv"))['text'].dropna()
+    texts = texts.sample(min(num_samples, len(texts)), random_state=42).tolist()
+
+    model = tf.keras.models.load_model(_path("cnn_model", "cnn_model.keras"))
+    tokenizer = joblib.load(_path("tokenizer", "tokenizer.joblib"))
+    lite = LitePredictor(_path("tflite_model", "cnn_model.tflite"), _path("vocabulary", "tokenizer_vocab.json"))
+
+    padded = pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=params["max_length"],
+                           padding='post', truncating='post')
+    assert np.array_equal(padded, lite.tokenizer.texts_to_padded(texts)), "LiteTokenizer differs from Keras"
+
+    keras_top3 = np.argsort(np.asarray(model.predict_on_batch(padded)), axis=1)[:, ::-1][:, :3]
+    lite_top3 = np.argsort(lite.predict_proba(texts), axis=1)[:, ::-1][:, :3]
+    top1_agreement = float(np.mean(keras_top3[:, 0] == lite_top3[:, 0]))
+    top3_agreement = float(np.mean(np.all(keras_top3 == lite_top3, axis=1)))
+
+    def latency_ms(fn):
+        latencies = []
+        for start in range(0, len(texts), batch_size):
+            t = time.perf_counter()
+            fn(texts[start:start + batch_size])
+            latencies.append((time.perf_counter() - t) * 1000)
+        return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+    keras_p50, keras_p99 = latency_ms(lambda batch: model.predict_on_batch(
+        pad_sequences(tokenizer.texts_to_sequences(batch), maxlen=params["max_length"], padding='post', truncating='post')))
+    lite_p50, lite_p99 = latency_ms(lite.predict_proba)
+
+    keras_startup = _startup_seconds(
+        f"import joblib; from tensorflow.keras.models import load_model; "
+        f"load_model({_path('cnn_model', 'cnn_model.keras')!r}); joblib.load({_path('tokenizer', 'tokenizer.joblib')!r})")
+    lite_startup = _startup_seconds(
+        f"from lite_predict import LitePredictor; "
+        f"LitePredictor({_path('tflite_model', 'cnn_model.tflite')!r}, {_path('vocabulary', 'tokenizer_vocab.json')!r})")
+
+    print(f"Parity on {len(texts)} samples: top-1 agreement {top1_agreement:.2%}, "
+          f"identical top-3 {top3_agreement:.2%}")
+    print(f"\n{'backend':<10}{'startup s':>12}{'p50 ms':>10}{'p99 ms':>10}   (batch size {batch_size})")
+    print(f"{'keras':<10}{keras_startup:>12.2f}{keras_p50:>10.3f}{keras_p99:>10.3f}")
+    print(f"{'tflite':<10}{lite_startup:>12.2f}{lite_p50:>10.3f}{lite_p99:>10.3f}")
+    return top1_agreement, top3_agreement
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the CNN to TFLite for lightweight serving.")
+    parser.add_argument("--quantization", choices=["none", "dynamic", "int8"],
+                        help="Overrides cnn_model.quantization in config.yaml.")
+    parser.add_argument("--verify", action="store_true", help="Run the parity and latency comparison after exporting.")
+    args = parser.parse_args()
+
+    export_tflite(quantization=args.quantization or config["cnn_model"].get("quantization"))
+    if args.verify:
+        verify_export()
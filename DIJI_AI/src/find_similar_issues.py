@@ -1,44 +1,62 @@
 
 
 import os
+import sys
 os.environ['CURL_CA_BUNDLE'] = ''
 
 import faiss
-import pickle
 import numpy as np
+import pandas as pd
 from sentence_transformers import SentenceTransformer
 
+sys.path.append(os.path.dirname(__file__))
+from index_factory import load_index_config, set_search_params
+from mapping_store import MappingStore
+
 class IssueFinder:
-    def __init__(self, index_path, data_mapping_path, model):
+    def __init__(self, index_path, data_mapping_path, model, index_params=None, embedding_cache=None):
         print("Loading FAISS index...")
         self.index = faiss.read_index(index_path)
+        # nprobe / efSearch come from config.yaml so they can be tuned without a rebuild.
+        set_search_params(self.index, index_params or load_index_config())
         
         print("Loading data mapping...")
-        with open(data_mapping_path, 'rb') as f:
-            self.df_map = pickle.load(f)
+        self.df_map = MappingStore(data_mapping_path)
             
         self.model = model
+        # Optional EmbeddingCache, so repeated queries skip the encoder.
+        self.embedding_cache = embedding_cache
         print("IssueFinder initialized.")
 
+    def _encode(self, texts, **encode_kwargs):
+        if self.embedding_cache is not None:
+            return self.embedding_cache.encode(self.model, texts, **encode_kwargs)
+        return np.asarray(self.model.encode(texts, **encode_kwargs), dtype='float32')
+
+    def search(self, query, k=5):
+        """
+        Returns (distances, ids) of the k nearest defects, closest first,
+        without printing or reading the mapping.
+        """
+        distances, indices = self.index.search(self._encode([query]), k)
+        # FAISS pads with -1 when the index holds fewer than k vectors.
+        found = indices[0] != -1
+        return distances[0][found], indices[0][found]
+
     def find_similar(self, query, k=5):
         """
         Finds k most similar issues to a given query.
         """
         print(f"\nSearching for top {k} similar issues for query: '{query}'")
         
-        # Encode the query to get its embedding
-        query_embedding = self.model.encode([query])
-        query_embedding = np.array(query_embedding).astype('float32')
-
-        # Perform the search
-        distances, indices = self.index.search(query_embedding, k)
+        # Encode the query and perform the search
+        distances, ids = self.search(query, k)
         
         print("\n--- Search Results ---")
-        # indices is a 2D array, so we take the first row
-        for i, idx in enumerate(indices[0]):
-            # Retrieve the original data using the index
-            similar_issue = self.df_map.iloc[idx]
-            distance = distances[0][i]
+        # Retrieve the original data using the FAISS ids
+        similar_issues = self.df_map.loc(ids)
+        for i, (_, similar_issue) in enumerate(similar_issues.iterrows()):
+            distance = distances[i]
             
             print(f"Result {i+1}: (Distance: {distance:.4f})")
             print(f"  Defect_ID: {similar_issue['Defect_ID']}")
@@ -46,14 +64,42 @@ class IssueFinder:
             print(f"  Root_Cause: {similar_issue['Root_Cause']}")
             print("---")
         
-        return self.df_map.iloc[indices[0]]
+        return similar_issues
+
+    def find_similar_batch(self, queries, k=5, batch_size=256):
+        """
+        Finds the k most similar issues for many queries in one pass.
+
+        All queries are encoded in a single model.encode call (batch_size
+        controls the encoder's internal batching) and searched with a single
+        matrix index.search. Nothing is printed.
+
+        Returns a DataFrame with one row per hit: query_index (position in
+        queries), rank (0 = closest), distance and the mapped defect columns.
+        """
+        queries = list(queries)
+        columns = ['query_index', 'rank', 'distance'] + list(self.df_map.columns)
+        if not queries:
+            return pd.DataFrame(columns=columns)
+
+        query_embeddings = self._encode(queries, batch_size=batch_size)
+        distances, indices = self.index.search(query_embeddings, k)
+
+        # np.nonzero walks the result matrix row by row, so hits stay grouped
+        # by query and ordered by rank. -1 marks missing hits.
+        query_index, rank = np.nonzero(indices != -1)
+        results = self.df_map.loc(indices[query_index, rank]).reset_index(drop=True)
+        results.insert(0, 'query_index', query_index)
+        results.insert(1, 'rank', rank)
+        results.insert(2, 'distance', distances[query_index, rank])
+        return results[columns]
 
 if __name__ == '__main__':
     current_dir = os.path.dirname(__file__)
     base_dir = os.path.abspath(os.path.join(current_dir, '..'))
     
     index_file = os.path.join(base_dir, 'vector_index', 'diji_ai.index')
-    mapping_file = os.path.join(base_dir, 'vector_index', 'data_mapping.pkl')
+    mapping_file = os.path.join(base_dir, 'vector_index', 'data_mapping')
 
     # Check if the index files exist
     if not os.path.exists(index_file) or not os.path.exists(mapping_file):
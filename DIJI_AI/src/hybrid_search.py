@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(__file__))
+from artifacts import config_section
+from bm25_index import BM25Index
+
+DEFAULT_RETRIEVAL_PARAMS = {
+    "hybrid": True,     # Fuse BM25 with FAISS; False searches FAISS only
+    "candidates": 50,   # Hits taken from each retriever before fusion
+    "rrf_k": 60,        # Reciprocal-rank fusion constant
+}
+
+
+def load_retrieval_config():
+    return config_section("retrieval", DEFAULT_RETRIEVAL_PARAMS)
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """
+    Fuses ranked id lists: score(id) = sum over lists of 1 / (rrf_k + rank),
+    with rank starting at 1. Returns [(id, score), ...], best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class HybridSearcher:
+    """
+    Combines an IssueFinder (dense FAISS) with a BM25 index over the same
+    defects and FAISS ids. Both retrievers run concurrently; the encoder,
+    FAISS and the NumPy BM25 scoring all release the GIL for their heavy work.
+    """
+
+    def __init__(self, finder, bm25_index_path, params=None):
+        self.finder = finder
+        self.params = params or load_retrieval_config()
+        self.bm25 = BM25Index(bm25_index_path)
+        self._executor = ThreadPoolExecutor(max_workers=2)
+
+    def search(self, query, k=5):
+        """
+        Returns the k best defects after reciprocal-rank fusion as a mapping
+        DataFrame indexed by FAISS id, with 'rrf_score', 'dense_rank' and
+        'bm25_rank' columns (rank -1 when a retriever did not return the defect).
+        """
+        candidates = max(k, self.params["candidates"])
+        start = time.perf_counter()
+        dense_future = self._executor.submit(self.finder.search, query, candidates)
+        bm25_future = self._executor.submit(self.bm25.search, query, candidates)
+        _, dense_ids = dense_future.result()
+        _, bm25_ids = bm25_future.result()
+        dense_ids, bm25_ids = [int(i) for i in dense_ids], [int(i) for i in bm25_ids]
+
+        fused = reciprocal_rank_fusion([dense_ids, bm25_ids], self.params["rrf_k"])[:k]
+        ids = [doc_id for doc_id, _ in fused]
+        results = self.finder.df_map.loc(ids)
+        results['rrf_score'] = [score for _, score in fused]
+        dense_rank = {doc_id: rank for rank, doc_id in enumerate(dense_ids)}
+        bm25_rank = {doc_id: rank for rank, doc_id in enumerate(bm25_ids)}
+        results['dense_rank'] = [dense_rank.get(doc_id, -1) for doc_id in ids]
+        results['bm25_rank'] = [bm25_rank.get(doc_id, -1) for doc_id in ids]
+        print(f"Hybrid search: {len(dense_ids)} dense + {len(bm25_ids)} BM25 candidates fused "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return results
@@ -0,0 +1,153 @@
+import os
+import sys
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+from artifacts import config_section
+
+DEFAULT_INDEX_PARAMS = {
+    "type": "flat",               # flat | ivf_flat | ivf_pq | hnsw
+    "nlist": 1024,                # IVF: number of inverted lists (coarse centroids)
+    "nprobe": 16,                 # IVF: lists visited per query
+    "pq_m": 48,                   # IVF-PQ: sub-quantizers (must divide the embedding size)
+    "pq_nbits": 8,                # IVF-PQ: bits per sub-quantizer code
+    "hnsw_m": 32,                 # HNSW: neighbours per node
+    "ef_construction": 200,       # HNSW: candidate list size while building
+    "ef_search": 64,              # HNSW: candidate list size while searching
+    "train_sample_size": 100000,  # Vectors used to train IVF/PQ indexes
+}
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+def load_index_config():
+    """
+    The vector_index settings, with the index type checked.
+    """
+    params = config_section("vector_index", DEFAULT_INDEX_PARAMS)
+    if params["type"] not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector_index type '{params['type']}'. Expected one of {INDEX_TYPES}.")
+    return params
+
+
+def needs_training(params):
+    return params["type"] in ("ivf_flat", "ivf_pq")
+
+
+def supports_removal(params):
+    # HNSW graphs cannot drop vectors, so they only support full rebuilds.
+    return params["type"] != "hnsw"
+
+
+def build_index(d, params, train_embeddings=None):
+    """
+    Creates an empty FAISS index of the configured type for d-dimensional
+    vectors and trains it when the type requires it.
+
+    Every index returned here accepts add_with_ids, so it can be used by both
+    the full and the incremental builders.
+    """
+    index_type = params["type"]
+
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(d))
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.hnsw.efSearch = params["ef_search"]
+        return faiss.IndexIDMap(index)
+
+    if train_embeddings is None or len(train_embeddings) == 0:
+        raise ValueError(f"A '{index_type}' index needs training vectors.")
+
+    # k-means needs roughly 39 points per centroid to train well.
+    nlist = min(params["nlist"], max(1, len(train_embeddings) // 39))
+    if nlist != params["nlist"]:
+        print(f"Only {len(train_embeddings)} training vectors; using nlist={nlist} instead of {params['nlist']}.")
+
+    if index_type == "ivf_flat":
+        factory_string = f"IVF{nlist},Flat"
+    else:
+        if d % params["pq_m"] != 0:
+            raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dimension {d}.")
+        factory_string = f"IVF{nlist},PQ{params['pq_m']}x{params['pq_nbits']}"
+
+    index = faiss.index_factory(d, factory_string)
+    print(f"Training {factory_string} index on {len(train_embeddings)} vectors...")
+    index.train(train_embeddings)
+    set_search_params(index, params)
+    return index
+
+
+def sample_for_training(embeddings, params, seed=42):
+    """
+    Returns at most train_sample_size rows of embeddings, chosen at random.
+    """
+    n = params["train_sample_size"]
+    if len(embeddings) <= n:
+        return embeddings
+    rng = np.random.default_rng(seed)
+    return embeddings[rng.choice(len(embeddings), n, replace=False)]
+
+
+def set_search_params(index, params):
+    """
+    Applies the query-time knobs to a loaded index: nprobe when it is an IVF
+    index, efSearch when it is HNSW. The index itself decides which knob
+    applies, not vector_index.type, so an index built before the config
+    changed still loads; knobs it does not have are skipped.
+    """
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+    if ivf is not None:
+        ivf.nprobe = params["nprobe"]
+        return
+
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = params["ef_search"]
+
+
+def reconstruct_all(index):
+    """
+    Returns (ids, embeddings) for every vector stored in a flat, HNSW or
+    IVF-Flat index.
+
+    Works for the plain IndexFlatL2 written by older builds as well as the
+    ID-mapped indexes, so the stored embeddings can be reused instead of
+    re-encoding the corpus. IVF-PQ only keeps lossy codes and is refused.
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        inner = faiss.downcast_index(index.index)
+        ids = faiss.vector_to_array(index.id_map).astype('int64')
+    else:
+        inner = index
+        ids = np.arange(index.ntotal, dtype='int64')
+
+    if isinstance(inner, faiss.IndexHNSWFlat):
+        inner = faiss.downcast_index(inner.storage)
+
+    if isinstance(inner, faiss.IndexIVFFlat):
+        # The vectors sit unchanged in the inverted lists, next to their ids.
+        invlists = inner.invlists
+        all_ids, all_embeddings = [], []
+        for list_no in range(inner.nlist):
+            size = invlists.list_size(list_no)
+            if size == 0:
+                continue
+            all_ids.append(faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy())
+            codes = faiss.rev_swig_ptr(invlists.get_codes(list_no), size * invlists.code_size).copy()
+            all_embeddings.append(codes.view('float32').reshape(size, inner.d))
+        if not all_ids:
+            return np.empty(0, dtype='int64'), np.empty((0, inner.d), dtype='float32')
+        return np.concatenate(all_ids).astype('int64'), np.concatenate(all_embeddings)
+
+    if not isinstance(inner, faiss.IndexFlat):
+        raise ValueError("Embeddings can only be recovered from a flat, HNSW or IVF-Flat index.")
+
+    embeddings = inner.reconstruct_n(0, inner.ntotal)
+    return ids, np.asarray(embeddings, dtype='float32')
@@ -1,23 +1,138 @@
-import requests
-import yaml
 import os
+import sys
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.append(os.path.dirname(__file__))
+from artifacts import config
+
+def jira_settings():
+    """
+    Jira connection settings from config.yaml, read on first use rather than at import.
+    """
+    jira = config()["jira"]
+    return {
+        "auth": (jira["email"], jira["api_token"]),
+        # base_url overrides the domain, e.g. "http://127.0.0.1:8089" for src/mock_jira_server.py.
+        "base_url": jira.get("base_url") or f"https://{jira['domain']}",
+        "page_size": jira.get("page_size", 100),
+        "max_workers": jira.get("max_workers", 8),
+        "max_retries": jira.get("max_retries", 5),
+        "timeout": jira.get("timeout_s", 30),
+    }
+
+_sessions = {}
+_session_lock = threading.Lock()
+
+def _build_session(settings, retry):
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings["max_workers"], max_retries=retry)
+    session = requests.Session()
+    session.auth = settings["auth"]
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """
+    Returns the shared, connection-pooled session used for Jira reads.
+
+    Idempotent requests answered with 429 or 5xx are retried with exponential
+    backoff, honouring Retry-After.
+    """
+    with _session_lock:
+        if "read" not in _sessions:
+            settings = jira_settings()
+            _sessions["read"] = _build_session(settings, Retry(
+                total=settings["max_retries"],
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+            ))
+        return _sessions["read"]
 
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
-config = yaml.safe_load(open(config_path))
-JIRA_DOMAIN = config["jira"]["domain"]
-AUTH = (config["jira"]["email"], config["jira"]["api_token"])
+def get_write_session():
+    """
+    Returns the shared session used for non-idempotent Jira writes (comment POSTs).
 
-def fetch_closed_defects(jql="status=Closed"):
-    url = f"https://{JIRA_DOMAIN}/rest/api/3/search"
-    params = {"jql": jql, "maxResults": 100}
-    r = requests.get(url, params=params, auth=AUTH)
+    A 500/502/504 or a read timeout may come after Jira committed the write,
+    so retrying could post a duplicate. Only failures where the request was
+    not processed are retried: connection errors, and 429/503, which Jira
+    answers with Retry-After.
+    """
+    with _session_lock:
+        if "write" not in _sessions:
+            settings = jira_settings()
+            _sessions["write"] = _build_session(settings, Retry(
+                total=settings["max_retries"],
+                read=0,
+                backoff_factor=0.5,
+                status_forcelist=(429, 503),
+                allowed_methods=frozenset({"POST"}),
+                respect_retry_after_header=True,
+            ))
+        return _sessions["write"]
+
+def _fetch_page(jql, start_at, max_results):
+    settings = jira_settings()
+    url = f"{settings['base_url']}/rest/api/3/search"
+    params = {"jql": jql, "startAt": start_at, "maxResults": max_results}
+    r = get_session().get(url, params=params, timeout=settings["timeout"])
     r.raise_for_status()
     return r.json()
 
+def fetch_closed_defects(jql="status=Closed", limit=None):
+    """
+    Fetches every issue matching the JQL, following startAt pagination.
+
+    The first page gives the total; the remaining pages are fetched
+    concurrently with at most jira.max_workers requests in flight. Returns a
+    search-style dict whose 'issues' holds all pages in order.
+    """
+    settings = jira_settings()
+    first = _fetch_page(jql, 0, settings["page_size"])
+    issues = list(first.get("issues", []))
+    total = first.get("total", len(issues))
+    if limit is not None:
+        total = min(total, limit)
+
+    # Jira may cap maxResults below what we asked for, so page by what it returned.
+    page_size = first.get("maxResults") or len(issues)
+    if page_size and len(issues) < total:
+        starts = range(len(issues), total, page_size)
+        with ThreadPoolExecutor(max_workers=settings["max_workers"]) as executor:
+            pages = executor.map(lambda start: _fetch_page(jql, start, page_size), starts)
+            for page in pages:
+                issues.extend(page.get("issues", []))
+
+    issues = issues[:total]
+    return {"startAt": 0, "maxResults": len(issues), "total": total, "issues": issues}
+
 def post_comment(issue_key, body):
-    url = f"https://{JIRA_DOMAIN}/rest/api/3/issue/{issue_key}/comment"
+    settings = jira_settings()
+    url = f"{settings['base_url']}/rest/api/3/issue/{issue_key}/comment"
     headers = {"Content-Type":"application/json"}
     payload = {"body": body}
-    r = requests.post(url, json=payload, auth=AUTH, headers=headers)
+    r = get_write_session().post(url, json=payload, headers=headers, timeout=settings["timeout"])
     r.raise_for_status()
     return r.json()
+
+def post_comments_bulk(comments, max_workers=None):
+    """
+    Posts many comments concurrently.
+
+    comments maps issue key -> comment body. Returns a dict mapping each
+    issue key to the created comment, or to the exception that was raised
+    once retries were exhausted.
+    """
+    def post(item):
+        issue_key, body = item
+        try:
+            return issue_key, post_comment(issue_key, body)
+        except requests.exceptions.RequestException as e:
+            return issue_key, e
+
+    with ThreadPoolExecutor(max_workers=max_workers or jira_settings()["max_workers"]) as executor:
+        return dict(executor.map(post, comments.items()))
@@ -0,0 +1,120 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+from mapping_store import MappingStore
+
+# Node types, stored as small integers in the 'type' column of the node table.
+NODE_TYPES = ["defect", "root_cause", "application", "error_code"]
+
+# On-disk layout of a graph directory:
+#   nodes/       node table (type, name) written with mapping_store.save_mapping
+#   indptr.npy   CSR row pointers: neighbours of node i are indices[indptr[i]:indptr[i + 1]]
+#   indices.npy  CSR column indices (undirected, so every edge is stored both ways)
+
+
+class KnowledgeGraph:
+    """
+    Memory-mapped defect knowledge graph written by knowledge_graph_builder.
+
+    Defects are linked to their root cause, application and error code.
+    Queries walk the CSR adjacency directly; nothing is parsed on load.
+    """
+
+    def __init__(self, graph_dir):
+        self.nodes = MappingStore(os.path.join(graph_dir, "nodes"))
+        self.indptr = np.load(os.path.join(graph_dir, "indptr.npy"), mmap_mode='r')
+        self.indices = np.load(os.path.join(graph_dir, "indices.npy"), mmap_mode='r')
+        self._ids_by_type = {}
+
+    @property
+    def number_of_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def number_of_edges(self):
+        return len(self.indices) // 2
+
+    def node(self, node_id):
+        """
+        Returns (type, name) for a node id.
+        """
+        return NODE_TYPES[self.nodes.value("type", node_id)], self.nodes.value("name", node_id)
+
+    def node_id(self, node_type, name):
+        """
+        Returns the id of the node with this type and name, or None.
+        The name index for a type is built on its first lookup.
+        """
+        if node_type not in self._ids_by_type:
+            type_code = NODE_TYPES.index(node_type)
+            ids = np.flatnonzero(self.nodes.array("type") == type_code)
+            self._ids_by_type[node_type] = {self.nodes.value("name", i): int(i) for i in ids}
+        return self._ids_by_type[node_type].get(str(name))
+
+    def neighbors(self, node_id):
+        return np.asarray(self.indices[self.indptr[node_id]:self.indptr[node_id + 1]])
+
+    def defects_with(self, root_cause=None, application=None, error_code=None):
+        """
+        Returns the Defect_IDs linked to every given attribute, e.g.
+        defects_with(error_code="503", application="Inventory Service").
+        """
+        attributes = {"root_cause": root_cause, "application": application, "error_code": error_code}
+        matches = None
+        for node_type, name in attributes.items():
+            if name is None:
+                continue
+            node_id = self.node_id(node_type, name)
+            if node_id is None:
+                return []
+            defects = self.neighbors(node_id)
+            matches = defects if matches is None else np.intersect1d(matches, defects, assume_unique=True)
+        if matches is None:
+            raise ValueError("Pass at least one of root_cause, application or error_code.")
+        return [self.nodes.value("name", i) for i in matches]
+
+    def attributes_of(self, defect_id):
+        """
+        Returns {node type: [names]} for the attributes linked to a defect.
+        """
+        node_id = self.node_id("defect", defect_id)
+        if node_id is None:
+            return {}
+        attributes = {}
+        for neighbor in self.neighbors(node_id):
+            node_type, name = self.node(neighbor)
+            attributes.setdefault(node_type, []).append(name)
+        return attributes
+
+    def related_defects(self, defect_id, by=("error_code", "application")):
+        """
+        Defects sharing every attribute type in `by` with the given defect,
+        e.g. the defects with the same error code and application.
+        """
+        attributes = self.attributes_of(defect_id)
+        related = None
+        for node_type in by:
+            defects = set()
+            for name in attributes.get(node_type, []):
+                defects.update(self.defects_with(**{node_type: name}))
+            related = defects if related is None else related & defects
+        related = related or set()
+        related.discard(str(defect_id))
+        return sorted(related)
+
+    def to_networkx(self):
+        """
+        Converts the graph to a networkx.Graph, for analyses not covered here.
+        """
+        import networkx as nx
+        G = nx.Graph()
+        for node_id in range(self.number_of_nodes):
+            node_type, name = self.node(node_id)
+            G.add_node(node_id, type=node_type, name=name)
+        for node_id in range(self.number_of_nodes):
+            for neighbor in self.neighbors(node_id):
+                if node_id < neighbor:
+                    G.add_edge(node_id, int(neighbor))
+        return G
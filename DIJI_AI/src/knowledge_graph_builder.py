@@ -1,52 +1,94 @@
 
 
 import pandas as pd
-import networkx as nx
+import numpy as np
+import sys
 import os
 
-def build_and_save_graph():
+sys.path.append(os.path.dirname(__file__))
+from mapping_store import save_array, save_mapping
+from knowledge_graph import NODE_TYPES, KnowledgeGraph
+
+# Raw data column for each attribute node type.
+ATTRIBUTE_COLUMNS = {"root_cause": "Root_Cause", "application": "Application", "error_code": "Error_Code"}
+
+def build_and_save_graph(data_path=None, graph_output_dir=None, chunksize=100_000):
     """
-    Reads raw defect data, builds a knowledge graph, and saves it to a file.
+    Reads raw defect data, builds a knowledge graph, and saves it to a directory.
     The graph connects defects to their attributes like root cause, application, etc.
+
+    The CSV is streamed in chunks and node ids are assigned column-wise, so
+    the edges for a chunk are built without a per-row loop. The graph is
+    stored as a node table plus CSR adjacency arrays; load it with
+    `knowledge_graph.KnowledgeGraph`.
     """
     # Construct paths relative to the script location
     script_dir = os.path.dirname(__file__)
-    data_path = os.path.abspath(os.path.join(script_dir, '''..''', '''data''', '''raw_data.csv'''))
-    graph_output_path = os.path.abspath(os.path.join(script_dir, '''..''', '''data''', '''diji_knowledge_graph.gml'''))
+    data_path = data_path or os.path.abspath(os.path.join(script_dir, '..', 'data', 'raw_data.csv'))
+    graph_output_dir = graph_output_dir or os.path.abspath(os.path.join(script_dir, '..', 'data', 'diji_knowledge_graph'))
 
     print(f"Reading data from {data_path}...")
+    columns = ['Defect_ID'] + list(ATTRIBUTE_COLUMNS.values())
     try:
-        df = pd.read_csv(data_path)
+        # Everything is read as text so e.g. error code 503 is named "503", not "503.0".
+        chunks = pd.read_csv(data_path, usecols=columns, dtype=str, chunksize=chunksize)
     except FileNotFoundError:
         print(f"Error: Data file not found at {data_path}")
         return
 
-    G = nx.Graph()
+    # type -> {name: node id}. Keying by type keeps e.g. an application and a
+    # root cause with the same name apart.
+    node_ids = {node_type: {} for node_type in NODE_TYPES}
+    node_types = []
+    node_names = []
+
+    def ids_for(node_type, values):
+        ids = node_ids[node_type]
+        # Only the chunk's distinct values are visited in Python.
+        for name in pd.unique(values):
+            if name not in ids:
+                ids[name] = len(node_names)
+                node_types.append(NODE_TYPES.index(node_type))
+                node_names.append(name)
+        return values.map(ids).to_numpy(dtype='int64')
 
     print("Building graph...")
-    for _, row in df.iterrows():
-        defect_id = row['Defect_ID']
-        root_cause = row['Root_Cause']
-        application = row['Application']
-        error_code = str(row['Error_Code'])
-
-        # Add nodes with attributes to distinguish their types
-        G.add_node(defect_id, type='defect')
-        G.add_node(root_cause, type='root_cause')
-        G.add_node(application, type='application')
-        G.add_node(error_code, type='error_code')
-
-        # Add edges to represent relationships
-        G.add_edge(defect_id, root_cause)
-        G.add_edge(defect_id, application)
-        G.add_edge(defect_id, error_code)
-
-    print(f"Graph built with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.")
-    
+    sources, targets = [], []
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=['Defect_ID'])
+        defect_nodes = ids_for("defect", chunk['Defect_ID'])
+        for node_type, column in ATTRIBUTE_COLUMNS.items():
+            present = chunk[column].notna().to_numpy()
+            sources.append(defect_nodes[present])
+            targets.append(ids_for(node_type, chunk[column][present]))
+
+    num_nodes = len(node_names)
+    sources = np.concatenate(sources) if sources else np.empty(0, dtype='int64')
+    targets = np.concatenate(targets) if targets else np.empty(0, dtype='int64')
+
+    # Duplicate rows would add the same edge twice; a graph keeps it once.
+    edges = np.unique(np.stack([sources, targets], axis=1), axis=0)
+
+    # Undirected CSR: store each edge in both directions, grouped by source node.
+    src = np.concatenate([edges[:, 0], edges[:, 1]])
+    dst = np.concatenate([edges[:, 1], edges[:, 0]])
+    order = np.argsort(src, kind='stable')
+    indices = dst[order]
+    indptr = np.zeros(num_nodes + 1, dtype='int64')
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+
+    print(f"Graph built with {num_nodes} nodes and {len(edges)} edges.")
+
     # Save the graph
-    nx.write_gml(G, graph_output_path)
-    print(f"Graph saved to {graph_output_path}")
+    os.makedirs(graph_output_dir, exist_ok=True)
+    nodes = pd.DataFrame({"type": np.array(node_types, dtype='int64'), "name": node_names},
+                         index=np.arange(num_nodes))
+    save_mapping(nodes, os.path.join(graph_output_dir, 'nodes'))
+    # Temp file + os.replace, as for the mapping, so a server loading the graph never maps a half-written array.
+    save_array(os.path.join(graph_output_dir, 'indptr.npy'), indptr)
+    save_array(os.path.join(graph_output_dir, 'indices.npy'), indices.astype('int64'))
+    print(f"Graph saved to {graph_output_dir}")
+    return KnowledgeGraph(graph_output_dir)
 
 if __name__ == '__main__':
     build_and_save_graph()
-
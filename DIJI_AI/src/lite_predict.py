@@ -0,0 +1,94 @@
+import json
+import numpy as np
+
+# Inference for the exported CNN with only a TFLite interpreter and NumPy.
+# tflite_runtime (requirements-serving.txt) is a few MB and starts in
+# milliseconds; the full TensorFlow interpreter is only used as a fallback
+# where no tflite-runtime wheel exists for the platform.
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    print("tflite_runtime is not installed; loading full TensorFlow for the TFLite interpreter. "
+          "Install requirements-serving.txt for the lightweight path.")
+    from tensorflow.lite import Interpreter
+
+
+class LiteTokenizer:
+    """
+    Re-implements Keras Tokenizer.texts_to_sequences and post-padding from
+    the JSON vocabulary written by export_model.py, without importing Keras.
+    """
+
+    def __init__(self, vocabulary):
+        self.word_index = vocabulary["word_index"]
+        self.num_words = vocabulary["num_words"]
+        self.oov_index = self.word_index.get(vocabulary["oov_token"]) if vocabulary["oov_token"] else None
+        self.lower = vocabulary["lower"]
+        self.split = vocabulary["split"]
+        self.translate_map = str.maketrans({c: self.split for c in vocabulary["filters"]})
+        self.max_length = vocabulary["max_length"]
+
+    def text_to_sequence(self, text):
+        if self.lower:
+            text = text.lower()
+        sequence = []
+        for word in text.translate(self.translate_map).split(self.split):
+            if not word:
+                continue
+            i = self.word_index.get(word)
+            if i is not None and not (self.num_words and i >= self.num_words):
+                sequence.append(i)
+            elif self.oov_index is not None:
+                sequence.append(self.oov_index)
+        return sequence
+
+    def texts_to_padded(self, texts):
+        padded = np.zeros((len(texts), self.max_length), dtype='int32')
+        for row, text in enumerate(texts):
+            sequence = self.text_to_sequence(text)[:self.max_length]
+            padded[row, :len(sequence)] = sequence
+        return padded
+
+
+class LitePredictor:
+    """
+    Root-cause predictor backed by the exported TFLite model.
+    """
+
+    def __init__(self, model_path, vocabulary_path, num_threads=None):
+        with open(vocabulary_path, 'r') as f:
+            vocabulary = json.load(f)
+        self.tokenizer = LiteTokenizer(vocabulary)
+        self.labels = np.array(vocabulary["labels"], dtype=object)
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+
+    def predict_proba(self, texts):
+        padded = self.tokenizer.texts_to_padded(texts).astype(self._input["dtype"])
+        if self._batch_size != len(padded):
+            self.interpreter.resize_tensor_input(self._input["index"], list(padded.shape))
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(padded)
+        self.interpreter.set_tensor(self._input["index"], padded)
+        self.interpreter.invoke()
+        probabilities = self.interpreter.get_tensor(self._output["index"])
+
+        # Undo output quantization when the model was exported with int8 outputs.
+        scale, zero_point = self._output.get("quantization", (0.0, 0))
+        if scale:
+            probabilities = (probabilities.astype('float32') - zero_point) * scale
+        return probabilities
+
+    def predict_texts(self, texts, top_k=3):
+        """
+        Same output as predict.predict_batch, for already combined texts.
+        """
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts)
+        top_indices = np.argsort(probabilities, axis=1)[:, ::-1][:, :top_k]
+        return [[(self.labels[i], float(row[i])) for i in indices] for row, indices in zip(probabilities, top_indices)]
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from artifacts import atomic_write
+
+# On-disk layout of a mapping directory:
+#   meta.json                  column names and how each one is stored
+#   ids.npy                    sorted row ids (FAISS ids for the vector index), one per row
+#   <col>.npy                  integer columns, stored as int64
+#   <col>.offsets.npy          string columns: row i is heap[offsets[i]:offsets[i + 1]]
+#   <col>.heap.npy             string columns: concatenated UTF-8 bytes
+# Every array is opened with mmap_mode='r', so workers on one host share the
+# pages through the OS page cache instead of each holding a private copy.
+
+
+def save_array(path, array):
+    """
+    np.save through a temporary file, so readers mapping path never see a
+    partly written array.
+    """
+    atomic_write(path, lambda tmp_path: np.save(tmp_path, array))
+
+
+def save_mapping(df, mapping_dir):
+    """
+    Writes a DataFrame indexed by integer id (the FAISS id, for the vector
+    index mapping) to mapping_dir as memory-mappable NumPy arrays.
+    """
+    os.makedirs(mapping_dir, exist_ok=True)
+    order = np.argsort(df.index.to_numpy(), kind='stable')
+    df = df.iloc[order]
+
+    meta = {"rows": len(df), "columns": {}}
+    save_array(os.path.join(mapping_dir, "ids.npy"), df.index.to_numpy().astype('int64'))
+
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_integer_dtype(values):
+            save_array(os.path.join(mapping_dir, f"{column}.npy"), values.to_numpy().astype('int64'))
+            meta["columns"][column] = "int"
+            continue
+
+        encoded = [str(v).encode('utf-8') if pd.notna(v) else b"" for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype='int64')
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        heap = np.frombuffer(b"".join(encoded), dtype='uint8')
+        save_array(os.path.join(mapping_dir, f"{column}.offsets.npy"), offsets)
+        save_array(os.path.join(mapping_dir, f"{column}.heap.npy"), heap)
+        meta["columns"][column] = "str"
+
+    # meta.json is replaced last so readers never see a half-written column list.
+    tmp_meta = os.path.join(mapping_dir, "meta.json.tmp")
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, os.path.join(mapping_dir, "meta.json"))
+
+
+class MappingStore:
+    """
+    Read-only, memory-mapped view of a mapping directory written by
+    `save_mapping`. Rows are looked up by FAISS id.
+    """
+
+    def __init__(self, mapping_dir):
+        with open(os.path.join(mapping_dir, "meta.json"), 'r') as f:
+            meta = json.load(f)
+
+        self.ids = np.load(os.path.join(mapping_dir, "ids.npy"), mmap_mode='r')
+        self.columns = list(meta["columns"])
+        self._kinds = meta["columns"]
+        self._arrays = {}
+        for column, kind in self._kinds.items():
+            if kind == "int":
+                self._arrays[column] = np.load(os.path.join(mapping_dir, f"{column}.npy"), mmap_mode='r')
+            else:
+                self._arrays[column] = (
+                    np.load(os.path.join(mapping_dir, f"{column}.offsets.npy"), mmap_mode='r'),
+                    np.load(os.path.join(mapping_dir, f"{column}.heap.npy"), mmap_mode='r'),
+                )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, ids):
+        """
+        Maps FAISS ids to row positions with a binary search over the sorted id array.
+        """
+        ids = np.asarray(ids, dtype='int64')
+        positions = np.searchsorted(self.ids, ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == ids[found]
+        if not found.all():
+            raise KeyError(f"FAISS ids not in the data mapping: {ids[~found].tolist()}")
+        return positions
+
+    def array(self, column):
+        """
+        Returns an integer column as a read-only memory-mapped array.
+        """
+        if self._kinds[column] != "int":
+            raise TypeError(f"Column '{column}' is not an integer column.")
+        return self._arrays[column]
+
+    def value(self, column, position):
+        if self._kinds[column] == "int":
+            return int(self._arrays[column][position])
+        offsets, heap = self._arrays[column]
+        return heap[offsets[position]:offsets[position + 1]].tobytes().decode('utf-8')
+
+    def loc(self, ids):
+        """
+        Returns the rows for the given FAISS ids as a DataFrame indexed by id.
+        Only the requested rows are read from disk.
+        """
+        ids = np.asarray(ids, dtype='int64')
+        positions = self.positions(ids)
+        data = {column: [self.value(column, p) for p in positions] for column in self.columns}
+        return pd.DataFrame(data, index=ids, columns=self.columns)
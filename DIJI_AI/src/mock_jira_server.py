@@ -0,0 +1,113 @@
+import re
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A minimal stand-in for the two Jira REST endpoints used by jira_api.py.
+# Point jira.base_url in config.yaml at it to exercise pagination, pooling
+# and retry/backoff without touching a real Jira instance.
+
+COMMENT_PATH = re.compile(r"^/rest/api/3/issue/([^/]+)/comment$")
+
+
+class MockJira:
+    def __init__(self, num_issues=250, max_page_size=100, fail_every=0):
+        """
+        fail_every=n answers every n-th request with a 429 to exercise retries.
+        """
+        self.issues = [
+            {"key": f"DEF-{i}", "fields": {"summary": f"Mock defect {i}", "description": f"Description of defect {i}"}}
+            for i in range(1, num_issues + 1)
+        ]
+        self.max_page_size = max_page_size
+        self.fail_every = fail_every
+        self.comments = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            return self.fail_every and self.requests % self.fail_every == 0
+
+    def search(self, start_at, max_results):
+        max_results = min(max_results, self.max_page_size)
+        return {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(self.issues),
+            "issues": self.issues[start_at:start_at + max_results],
+        }
+
+    def add_comment(self, issue_key, body):
+        with self._lock:
+            comments = self.comments.setdefault(issue_key, [])
+            comment = {"id": str(len(comments) + 1), "body": body}
+            comments.append(comment)
+        return comment
+
+
+def make_handler(jira):
+    class MockJiraHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if jira.should_fail():
+                self._send_json(429, {"errorMessages": ["Rate limited"]}, {"Retry-After": "0"})
+                return
+            url = urlparse(self.path)
+            if url.path != "/rest/api/3/search":
+                self._send_json(404, {"errorMessages": [f"Unknown path {url.path}"]})
+                return
+            query = parse_qs(url.query)
+            start_at = int(query.get("startAt", ["0"])[0])
+            max_results = int(query.get("maxResults", ["50"])[0])
+            self._send_json(200, jira.search(start_at, max_results))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if jira.should_fail():
+                self._send_json(429, {"errorMessages": ["Rate limited"]}, {"Retry-After": "0"})
+                return
+            match = COMMENT_PATH.match(urlparse(self.path).path)
+            if not match:
+                self._send_json(404, {"errorMessages": [f"Unknown path {self.path}"]})
+                return
+            self._send_json(201, jira.add_comment(match.group(1), payload.get("body")))
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockJiraHandler
+
+
+def start_mock_jira(host="127.0.0.1", port=0, **kwargs):
+    """
+    Starts a mock Jira server in a background thread.
+
+    Returns (server, jira, base_url); call server.shutdown() when done.
+    port=0 picks a free port.
+    """
+    jira = MockJira(**kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(jira))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, jira, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    server, jira, base_url = start_mock_jira(port=8089, fail_every=7)
+    print(f"Mock Jira listening on {base_url} with {len(jira.issues)} issues. Press Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,59 +1,115 @@
 import os
-import yaml
-import joblib
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 
 # Add the src directory to the Python path to allow for module imports
 import sys
 sys.path.append(os.path.dirname(__file__))
 from preprocess import combine_fields
+from artifacts import registry, config
 
-# --- 1. Load Config and Set Paths ---
-project_root = os.path.dirname(os.path.dirname(__file__))
-config_path = os.path.join(project_root, "config.yaml")
-with open(config_path, 'r') as f:
-    config = yaml.safe_load(f)
-
-# Get paths and parameters from config
-model_path = os.path.join(project_root, config["paths"]["cnn_model"])
-tokenizer_path = os.path.join(project_root, config["paths"]["tokenizer"])
-label_encoder_path = os.path.join(project_root, config["paths"]["label_encoder"])
-max_length = config["cnn_model"]["max_length"]
-
-# --- 2. Load Saved Artifacts ---
-try:
-    model = load_model(model_path)
-    tokenizer = joblib.load(tokenizer_path)
-    label_encoder = joblib.load(label_encoder_path)
-except Exception as e:
-    print(f"Error loading model or artifacts: {e}")
-    print("Please ensure the model has been trained and artifacts are present.")
-    model, tokenizer, label_encoder = None, None, None
+# Artifacts are loaded on first use through the registry, so importing this
+# module is cheap and a running process picks up artifacts published by
+# retrain.py without a restart.
+KERAS_ARTIFACTS = ("cnn_model", "tokenizer", "label_encoder")
+
+def backend():
+    # "keras" serves cnn_model.keras; "tflite" serves the export from export_model.py
+    # with only the TFLite interpreter and NumPy, without importing TensorFlow.
+    return (config().get("serving") or {}).get("backend", "keras")
+
+def warm_up():
+    """
+    Loads the artifacts for the configured backend now instead of on the first prediction.
+    """
+    names = ["lite_predictor"] if backend() == "tflite" else list(KERAS_ARTIFACTS)
+    return registry.warm_up(names)
+
+def _keras_artifacts():
+    try:
+        return registry.get_many(*KERAS_ARTIFACTS)
+    except Exception as e:
+        print(f"Error loading model or artifacts: {e}")
+        print("Please ensure the model has been trained and artifacts are present.")
+        raise RuntimeError("Model and artifacts are not loaded. Cannot make predictions.") from e
+
+def _pad(tokenizer, texts):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+    return pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=config()["cnn_model"]["max_length"],
+                         padding='post', truncating='post')
 
 def predict(issue: dict):
     """
     Predicts the root cause for a given issue using the trained CNN model.
     """
-    if not all([model, tokenizer, label_encoder]):
-        raise RuntimeError("Model and artifacts are not loaded. Cannot make predictions.")
+    return predict_batch([issue])[0]
+
+def predict_batch(issues, top_k=3, batch_size=None):
+    """
+    Predicts the root cause for many issues in one pass.
+
+    All issues are tokenized and padded together. By default they go through
+    a single forward pass; pass batch_size to score large backlogs in chunks.
+
+    Returns one list of (label, score) tuples per issue, best first.
+    """
+    if backend() == "tflite":
+        return registry.get("lite_predictor").predict_texts([combine_fields(issue) for issue in issues], top_k=top_k)
+    model, tokenizer, label_encoder = _keras_artifacts()
+    if not issues:
+        return []
 
     # 1. Preprocess the input text
-    text = combine_fields(issue)
-    sequence = tokenizer.texts_to_sequences([text])
-    padded_sequence = pad_sequences(sequence, maxlen=max_length, padding='post', truncating='post')
+    texts = [combine_fields(issue) for issue in issues]
+    padded_sequences = _pad(tokenizer, texts)
 
-    # 2. Make prediction
-    probabilities = model.predict(padded_sequence)[0]
+    # 2. Make prediction. predict_on_batch skips the per-call setup of
+    # model.predict, which dominates for small batches.
+    if batch_size is None:
+        probabilities = np.asarray(model.predict_on_batch(padded_sequences))
+    else:
+        probabilities = model.predict(padded_sequences, batch_size=batch_size, verbose=0)
 
     # 3. Decode predictions
-    top_indices = probabilities.argsort()[::-1][:3] # Get top 3 predictions
-    
-    preds = []
-    for i in top_indices:
-        label = label_encoder.classes_[i]
-        score = float(probabilities[i])
-        preds.append((label, score))
-        
-    return preds
\ No newline at end of file
+    top_indices = np.argsort(probabilities, axis=1)[:, ::-1][:, :top_k]
+
+    results = []
+    for row, indices in zip(probabilities, top_indices):
+        results.append([(label_encoder.classes_[i], float(row[i])) for i in indices])
+    return results
+
+def attribute_tokens(issue: dict, top_k=10, label=None):
+    """
+    Finds the tokens that drove the CNN's prediction for an issue, by occlusion.
+
+    Each token is replaced by the padding id in turn and the drop in the
+    label's probability is its attribution. The original sequence and every
+    occluded copy go through a single batched forward pass.
+
+    Returns (label, base score, [(position, token, attribution), ...]) with
+    the top_k tokens, largest attribution first. Without a label, the
+    predicted label is explained. Needs the keras backend.
+    """
+    model, tokenizer, label_encoder = _keras_artifacts()
+
+    text = combine_fields(issue)
+    padded_sequence = _pad(tokenizer, [text])[0]
+    positions = np.flatnonzero(padded_sequence)
+
+    # Row 0 is the unmodified issue; row i + 1 has token positions[i] masked.
+    batch = np.repeat(padded_sequence[np.newaxis, :], len(positions) + 1, axis=0)
+    batch[np.arange(1, len(positions) + 1), positions] = 0
+    probabilities = np.asarray(model.predict_on_batch(batch))
+
+    if label is None:
+        class_index = int(probabilities[0].argmax())
+    else:
+        class_index = int(np.flatnonzero(label_encoder.classes_ == label)[0])
+    base_score = float(probabilities[0, class_index])
+    attributions = base_score - probabilities[1:, class_index]
+
+    # Tokens outside the tokenizer's num_words are encoded as the OOV token.
+    index_word = tokenizer.index_word
+    ranked = np.argsort(attributions)[::-1][:top_k]
+    tokens = [(int(positions[i]), index_word.get(int(padded_sequence[positions[i]]), "<OOV>"), float(attributions[i]))
+              for i in ranked]
+    return label_encoder.classes_[class_index], base_score, tokens
@@ -1,12 +1,8 @@
-import pandas as pd
-from predict import predict
-import yaml
 import os
-
-# Load config
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
-config = yaml.safe_load(open(config_path))
-raw_data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), config["paths"]["raw_data"])
+import sys
+sys.path.append(os.path.dirname(__file__))
+from predict import predict
+from artifacts import registry
 
 # Mock issue for testing
 mock_issue = {
@@ -26,13 +22,14 @@ def predict_with_context(issue: dict):
     print(f"Prediction for new issue: {top_prediction_label} (Confidence: {top_prediction_prob:.2%})")
     print("-" * 20)
 
-    # Find similar issues
-    df = pd.read_csv(raw_data_path)
-    similar_issues = df[df["Root_Cause"] == top_prediction_label]
+    # Find similar issues: a lookup in the precomputed root-cause examples index,
+    # preferring defects from the same application or with the same error code.
+    similar_issues = registry.get("examples_index").lookup(
+        top_prediction_label, application=issue.get("Application"), error_code=issue.get("Error_Code"), n=3)
 
-    if not similar_issues.empty:
+    if similar_issues:
         print("Found similar historical issues:")
-        for _, row in similar_issues.head(3).iterrows():
+        for row in similar_issues:
             print(f"  - Defect ID: {row['Defect_ID']}, Summary: {row['Summary']}")
     else:
         print("No similar historical issues found.")
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# serve() warms the CNN, tokenizer and label encoder up once, so every
+# request served by this process hits warm artifacts. It refuses to start
+# when they cannot be loaded.
+sys.path.append(os.path.dirname(__file__))
+from predict import predict_batch, warm_up
+from artifacts import config_section, registry
+
+DEFAULT_SERVER_PARAMS = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "max_batch_size": 64,     # Requests scored in one predict_batch call
+    "max_wait_ms": 10,        # Longest a request waits for its batch to fill
+    "request_timeout_s": 30,
+}
+
+
+TEXT_FIELDS = ("Summary", "Comments")
+
+
+def validate_issue(issue):
+    """
+    Returns an error message for a payload predict_batch cannot score, or
+    None. Checked before queueing so a bad payload never joins a micro-batch.
+    """
+    if not isinstance(issue, dict):
+        return f"Issue must be a JSON object, got {type(issue).__name__}"
+    if not any(issue.get(field) for field in TEXT_FIELDS):
+        return f"Issue needs at least one of {', '.join(TEXT_FIELDS)}"
+    for field in TEXT_FIELDS:
+        if issue.get(field) is not None and not isinstance(issue[field], str):
+            return f"{field} must be a string, got {type(issue[field]).__name__}"
+    return None
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests into micro-batches.
+
+    A batch is dispatched when it reaches max_batch_size or when its oldest
+    request has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=10, latency_window=10000):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._queue_latencies_ms = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._started = time.time()
+        self._completed = 0
+        self._failed = 0
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, issue):
+        """
+        Queues an issue and returns a Future resolving to its predictions.
+        """
+        future = Future()
+        self._queue.put((issue, future, time.perf_counter()))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            dispatched = time.perf_counter()
+            try:
+                results = self.predict_fn([issue for issue, _, _ in batch])
+            except Exception:
+                # Retry one by one so only the request that caused the failure gets it.
+                results = self._run_individually(batch)
+
+            completed = 0
+            for (_, future, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+                    completed += 1
+            with self._lock:
+                self._completed += completed
+                self._failed += len(batch) - completed
+                self._batch_sizes.append(len(batch))
+                self._queue_latencies_ms.extend((dispatched - queued) * 1000 for _, _, queued in batch)
+
+    def _run_individually(self, batch):
+        results = []
+        for issue, _, _ in batch:
+            try:
+                results.append(self.predict_fn([issue])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def metrics(self):
+        with self._lock:
+            latencies = np.array(self._queue_latencies_ms) if self._queue_latencies_ms else np.zeros(1)
+            uptime = time.time() - self._started
+            return {
+                "completed": self._completed,
+                "failed": self._failed,
+                "queued": self._queue.qsize(),
+                "uptime_s": round(uptime, 1),
+                "throughput_per_s": round(self._completed / uptime, 2) if uptime else 0.0,
+                "mean_batch_size": round(float(np.mean(self._batch_sizes)), 2) if self._batch_sizes else 0.0,
+                "queue_latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+                "queue_latency_ms_p99": round(float(np.percentile(latencies, 99)), 3),
+            }
+
+
+def make_handler(batcher, request_timeout):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/metrics":
+                metrics = batcher.metrics()
+                metrics["artifacts"] = registry.memory_report()
+                self._send_json(200, metrics)
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self._send_json(400, {"error": f"Invalid JSON: {e}"})
+                return
+
+            # Accept a single issue or {"issues": [...]}.
+            issues = payload["issues"] if isinstance(payload, dict) and "issues" in payload else [payload]
+            if not isinstance(issues, list) or not issues:
+                self._send_json(400, {"error": "issues must be a non-empty list"})
+                return
+            for i, issue in enumerate(issues):
+                error = validate_issue(issue)
+                if error:
+                    self._send_json(400, {"error": f"Issue {i}: {error}"})
+                    return
+            futures = [batcher.submit(issue) for issue in issues]
+            try:
+                predictions = [future.result(timeout=request_timeout) for future in futures]
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"predictions": [
+                [{"label": label, "score": score} for label, score in preds] for preds in predictions
+            ]})
+
+        def log_message(self, format, *args):
+            # Per-request logging would dominate at webhook volumes; use /metrics instead.
+            pass
+
+    return PredictionHandler
+
+
+def serve(host=None, port=None):
+    params = config_section("prediction_server", DEFAULT_SERVER_PARAMS)
+    host = host or params["host"]
+    port = port or params["port"]
+    errors = warm_up()
+    if errors:
+        # Every request would fail, so don't start listening.
+        raise RuntimeError(f"Cannot serve predictions, artifacts failed to load: {', '.join(errors)}")
+    registry.print_memory_report()
+    batcher = MicroBatcher(
+        predict_batch,
+        max_batch_size=params["max_batch_size"],
+        max_wait_ms=params["max_wait_ms"],
+    )
+    handler = make_handler(batcher, params["request_timeout_s"])
+    httpd = ThreadingHTTPServer((host, port), handler)
+    print(f"Prediction server listening on http://{host}:{port} "
+          f"(max_batch_size={batcher.max_batch_size}, max_wait_ms={batcher.max_wait * 1000:.0f})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down prediction server.")
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    serve()
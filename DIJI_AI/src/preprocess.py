@@ -4,15 +4,22 @@ import sys
 import yaml
 import os
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from examples_index.index import ExamplesIndex
 
+TAG_RE = re.compile(r"<[^>]+>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Columns rendered verbatim into the text as "<prefix><value>".
+TAGGED_FIELDS = [("Error_Code", "error_code_"), ("Severity", "severity_"), ("Application", "app_")]
 
 
 def clean_text(text: str) -> str:
     if pd.isna(text):
         return ""
     text = text.lower()
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = re.sub(r"\s+", " ", text)
+    text = TAG_RE.sub(" ", text)
+    text = WHITESPACE_RE.sub(" ", text)
     return text.strip()
 
 
@@ -27,10 +34,61 @@ def combine_fields(row):
     return " ".join([p for p in parts if p])
 
 
-def preprocess_csv(input_path, output_path):
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
+def clean_text_series(texts: pd.Series) -> pd.Series:
+    """
+    Column-wise clean_text: same result for every element, one pass per regex.
+    """
+    texts = texts.where(texts.notna(), "")
+    return (texts.str.lower()
+                 .str.replace(TAG_RE, " ", regex=True)
+                 .str.replace(WHITESPACE_RE, " ", regex=True)
+                 .str.strip())
+
+
+def combine_fields_frame(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized combine_fields over a whole DataFrame.
+
+    The output is identical to df.apply(combine_fields, axis=1). Values of the
+    tagged fields are formatted with str(), as the f-strings in combine_fields do.
+    """
+    empty = pd.Series("", index=df.index, dtype=object)
+    summary = clean_text_series(df["Summary"]) if "Summary" in df else empty
+    comments = clean_text_series(df["Comments"]).str[:800] if "Comments" in df else empty
+
+    # Summary and comments are dropped from the join when they clean to "".
+    text = (summary + " ").where(summary != "", "") + (comments + " ").where(comments != "", "")
+    for i, (column, prefix) in enumerate(TAGGED_FIELDS):
+        values = df[column].map(str) if column in df else empty
+        text = text + (" " if i else "") + prefix + values
+    return text
+
+
+def _full_file_dtypes(input_path, columns):
+    """
+    Infers dtypes for the given columns from the whole file.
+
+    Chunks are parsed with these dtypes so that, for example, an Error_Code
+    column with a missing value somewhere renders as "503.0" in every chunk,
+    exactly as a single pd.read_csv of the file would. Only these few short
+    columns are read in full.
+    """
+    if not columns:
+        return {}
+    return pd.read_csv(input_path, usecols=columns).dtypes.to_dict()
+
+
+def preprocess_csv(input_path, output_path, chunksize=100_000, config=None, build_examples=False):
+    """
+    Cleans the raw defect export into the text + target CSV used for training.
+
+    With build_examples, the root-cause examples index is built in the same
+    pass and saved to paths.examples_index.
+    """
+    if config is None:
+        config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
     
     # Check for the new CNN model config first, with a fallback to the old one
     if 'cnn_model' in config:
@@ -38,11 +96,33 @@ def preprocess_csv(input_path, output_path):
     else:
         target_column = config["model"]["target_column"]
 
-    df = pd.read_csv(input_path)
-    df["text"] = df.apply(combine_fields, axis=1)
-    df_processed = df[["text", target_column]]
-    df_processed.to_csv(output_path, index=False)
-    print(f"Preprocessed data saved to {output_path}")
+    # Stream the file in chunks so memory stays bounded on large exports.
+    header = pd.read_csv(input_path, nrows=0).columns
+    formatted_columns = [c for c, _ in TAGGED_FIELDS] + [target_column]
+    dtypes = _full_file_dtypes(input_path, [c for c in formatted_columns if c in header])
+    dtypes.update({c: str for c in ("Summary", "Comments") if c in header})
+
+    examples_path = config.get("paths", {}).get("examples_index")
+    examples = ExamplesIndex() if build_examples and examples_path and "Defect_ID" in header else None
+
+    # Streamed into a temporary file and renamed at the end, so readers never see a partial CSV.
+    tmp_path = output_path + ".tmp"
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(input_path, dtype=dtypes, chunksize=chunksize)):
+        chunk["text"] = combine_fields_frame(chunk)
+        chunk[["text", target_column]].to_csv(tmp_path, index=False, header=(i == 0), mode="w" if i == 0 else "a")
+        if examples is not None:
+            examples.update(chunk, target_column=target_column)
+        rows += len(chunk)
+    if rows == 0:
+        pd.DataFrame(columns=["text", target_column]).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    print(f"Preprocessed {rows} rows. Data saved to {output_path}")
+
+    if examples is not None:
+        examples_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), examples_path)
+        examples.save(examples_path)
+        print(f"Examples index for {len(examples.levels['root_cause'])} root causes saved to {examples_path}")
 
 
 if __name__ == "__main__":
@@ -51,4 +131,4 @@ if __name__ == "__main__":
         sys.exit(1)
     input_csv_path = sys.argv[1]
     output_csv_path = sys.argv[2]
-    preprocess_csv(input_csv_path, output_csv_path)
+    preprocess_csv(input_csv_path, output_csv_path, build_examples=True)
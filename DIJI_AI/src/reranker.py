@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from artifacts import config_section
+from embedding_cache.scores import PairScoreCache
+
+DEFAULT_RERANKER_PARAMS = {
+    "enabled": True,
+    "model_name": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    "candidates": 50,       # Defects retrieved before reranking
+    "batch_size": 32,       # (query, defect) pairs per cross-encoder forward pass
+    "max_length": 256,      # Tokens per pair; longer pairs are truncated
+    "time_budget_ms": None, # Stop scoring new batches once this is spent
+}
+
+
+def load_reranker_config():
+    return config_section("reranker", DEFAULT_RERANKER_PARAMS)
+
+
+class CrossEncoderReranker:
+    """
+    Reorders retrieved defects with a local cross-encoder, which reads the
+    query and the defect together and is more precise than the bi-encoder
+    used for retrieval, but too slow to run over the whole corpus.
+
+    Pair scores are cached, so only pairs never seen before reach the model.
+    """
+
+    def __init__(self, params=None, score_cache=None):
+        from sentence_transformers import CrossEncoder
+
+        self.params = params or load_reranker_config()
+        print(f"Loading cross-encoder: {self.params['model_name']}...")
+        self.model = CrossEncoder(self.params["model_name"], max_length=self.params["max_length"])
+        self.score_cache = score_cache if score_cache is not None else PairScoreCache(self.params["model_name"])
+        self.last_timing = {}
+
+    def rerank(self, query, candidates, k=3, text_column='text'):
+        """
+        Returns the k best rows of candidates (a DataFrame in retrieval order)
+        with a 'rerank_score' column, best first.
+
+        Defects are scored on text_column, by default the Summary + Comments
+        text that retrieval embedded. Mappings built before that column was
+        stored fall back to Summary.
+
+        With time_budget_ms set, batches are no longer scored once the budget
+        is spent; candidates left unscored keep their retrieval order behind
+        the scored ones, so the stage never blocks triage for long.
+        """
+        start = time.perf_counter()
+        if text_column not in candidates and 'Summary' in candidates:
+            print(f"Rerank: no '{text_column}' column in the data mapping, scoring Summary only. "
+                  f"Rebuild the vector index to store it.")
+            text_column = 'Summary'
+        passages = candidates[text_column].fillna('').astype(str).tolist()
+        keys = [self.score_cache.key(query, passage) for passage in passages]
+        scores = self.score_cache.get_many(keys)
+        lookup_ms = (time.perf_counter() - start) * 1000
+
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        batch_size = self.params["batch_size"]
+        budget_ms = self.params.get("time_budget_ms")
+        model_start = time.perf_counter()
+        scored = {}
+        for batch_start in range(0, len(missing), batch_size):
+            if budget_ms and (time.perf_counter() - start) * 1000 >= budget_ms:
+                break
+            batch = missing[batch_start:batch_start + batch_size]
+            batch_scores = self.model.predict([(query, passages[i]) for i in batch], batch_size=batch_size)
+            for i, score in zip(batch, np.asarray(batch_scores, dtype='float32').ravel()):
+                scored[keys[i]] = float(score)
+        model_ms = (time.perf_counter() - model_start) * 1000
+        self.score_cache.put_many(scored)
+        scores.update(scored)
+
+        results = candidates.copy()
+        results['rerank_score'] = [scores.get(key, np.nan) for key in keys]
+        # Scored rows first, by score; unscored rows after, in retrieval order.
+        order = np.lexsort((np.arange(len(results)),
+                            -results['rerank_score'].fillna(-np.inf).to_numpy(),
+                            results['rerank_score'].isna().to_numpy()))
+        results = results.iloc[order[:k]]
+
+        self.last_timing = {
+            "candidates": len(keys),
+            "cached": len(keys) - len(missing),
+            "scored": len(scored),
+            "skipped": len(missing) - len(scored),
+            "cache_lookup_ms": lookup_ms,
+            "model_ms": model_ms,
+            "total_ms": (time.perf_counter() - start) * 1000,
+        }
+        t = self.last_timing
+        print(f"Rerank: {t['candidates']} candidates, {t['cached']} cached, {t['scored']} scored, "
+              f"{t['skipped']} skipped; model {t['model_ms']:.1f} ms, total {t['total_ms']:.1f} ms")
+        return results
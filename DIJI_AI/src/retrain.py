@@ -1,20 +1,147 @@
-import subprocess
-import yaml
 import os
+import sys
+import json
+import time
+import hashlib
+import yaml
+
+sys.path.append(os.path.dirname(__file__))
 
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
+project_root = os.path.dirname(os.path.dirname(__file__))
+config_path = os.path.join(project_root, "config.yaml")
 config = yaml.safe_load(open(config_path))
 
+
+def fingerprint(*parts):
+    """
+    Hashes files (by content) and plain values into one stage fingerprint.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str) and os.path.isfile(part):
+            with open(part, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class StageFailed(Exception):
+    pass
+
+
+class RetrainPipeline:
+    """
+    Runs the retrain stages in-process, skipping a stage when the fingerprint
+    of its inputs matches the last successful run and its outputs still exist.
+
+    Stage fingerprints are kept in a small JSON state file next to the caches.
+    """
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                self.state = json.load(f)
+        self.report = []
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+
+    def run_stage(self, name, stage_fingerprint, outputs, fn):
+        previous = self.state.get(name, {})
+        if previous.get("fingerprint") == stage_fingerprint and all(os.path.exists(p) for p in outputs):
+            self.report.append((name, "skipped", 0.0, ""))
+            print(f"[{name}] inputs unchanged, skipping.")
+            return
+
+        print(f"[{name}] running...")
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            self.report.append((name, "failed", time.perf_counter() - start, f"{type(e).__name__}: {e}"))
+            raise StageFailed(name) from e
+        self.report.append((name, "ran", time.perf_counter() - start, ""))
+        self.state[name] = {"fingerprint": stage_fingerprint, "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self._save_state()
+
+    def print_report(self):
+        print(f"\n{'stage':<12}{'status':<10}{'seconds':>10}")
+        for name, status, seconds, error in self.report:
+            print(f"{name:<12}{status:<10}{seconds:>10.1f}" + (f"  {error}" if error else ""))
+
+
 def retrain():
-    src_dir = os.path.dirname(__file__)
-    preprocess_script_path = os.path.join(src_dir, "preprocess.py")
-    train_script_path = os.path.join(src_dir, "train.py")
+    """
+    Preprocesses the raw data and retrains the CNN in a single process.
+
+    Stages: preprocess (raw CSV -> cleaned text), sequences (tokenizer +
+    padded sequences, cached by data hash), model and export (TFLite model +
+    JSON vocabulary). Returns True on success.
+    """
+    # Imported here so TensorFlow and pandas load once, in this process.
+    import preprocess
+    import train
+
+    paths = config["paths"]
+    params = config["cnn_model"]
+    raw_data_path = os.path.join(project_root, paths["raw_data"])
+    processed_data_path = os.path.join(project_root, paths["processed_data"])
+    cache_dir = os.path.join(project_root, paths.get("sequence_cache", "cache/sequences"))
+    model_outputs = [os.path.join(project_root, paths[key]) for key in ("cnn_model", "tokenizer", "label_encoder")]
+
+    pipeline = RetrainPipeline(os.path.join(project_root, "cache", "retrain_state.json"))
+    try:
+        pipeline.run_stage(
+            "preprocess",
+            fingerprint(raw_data_path, preprocess.__file__, params["target_column"]),
+            [processed_data_path] + ([os.path.join(project_root, paths["examples_index"])]
+                                     if paths.get("examples_index") else []),
+            lambda: preprocess.preprocess_csv(raw_data_path, processed_data_path, config=config,
+                                              build_examples=True),
+        )
+
+        sequence_key = train.sequence_cache_key(processed_data_path, params)
+        pipeline.run_stage(
+            "sequences",
+            sequence_key,
+            [os.path.join(cache_dir, sequence_key)],
+            lambda: train.prepare_sequences(processed_data_path, params, cache_dir),
+        )
+
+        training_params = {key: params.get(key) for key in train.TRAINING_PARAM_KEYS}
+        model_fingerprint = fingerprint(sequence_key, training_params, train.__file__)
+        pipeline.run_stage(
+            "model",
+            model_fingerprint,
+            model_outputs,
+            # Reads the sequences cached by the previous stage.
+            lambda: train.train_cnn(config),
+        )
+
+        import export_model
+        pipeline.run_stage(
+            "export",
+            fingerprint(model_fingerprint, params.get("quantization"), export_model.__file__),
+            [os.path.join(project_root, paths[key]) for key in ("tflite_model", "vocabulary")],
+            lambda: export_model.export_tflite(params.get("quantization")),
+        )
+    except StageFailed as e:
+        print(f"\nRetrain failed in stage '{e}'.")
+        pipeline.print_report()
+        return False
 
-    # Paths for raw and processed data are relative to the project root (DIJI_AI folder)
-    # So, we need to pass them as is, and the subprocesses will handle them correctly
-    # if they also load config.yaml with the correct path.
-    subprocess.run(["python", preprocess_script_path, config["paths"]["raw_data"], config["paths"]["processed_data"]], cwd=os.path.dirname(src_dir))
-    subprocess.run(["python", train_script_path], cwd=os.path.dirname(src_dir))
+    pipeline.print_report()
+    # Running predictors hot-swap to the new artifacts.
+    import artifacts
+    artifacts.publish()
+    return True
 
 if __name__ == "__main__":
-    retrain()
+    sys.exit(0 if retrain() else 1)
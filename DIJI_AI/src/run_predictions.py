@@ -2,13 +2,16 @@
 
 import os
 import sys
+import argparse
 import pandas as pd
 
 # Add the src directory to the Python path to allow for module imports
 sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from jira_api import fetch_closed_defects, post_comment
-from predict import predict
+from predict import predict, predict_batch
+from artifacts import registry
 
 def format_comment(prediction_results, historical_examples):
     """Formats the prediction and examples into a Jira comment."""
@@ -22,27 +25,114 @@ h2. AI Root Cause Analysis
 
 h2. Context from Similar Historical Defects
 """
-    if not historical_examples.empty:
+    if historical_examples:
         comment += "Here are some past defects with the same predicted root cause:\n"
-        for index, row in historical_examples.iterrows():
+        for row in historical_examples:
             comment += f"* *{row['Defect_ID']}*: {row['Summary']}\n"
     else:
         comment += f"No historical examples found for the root cause: '{predicted_label}'\n"
 
     return comment
 
+def issue_details_from_jira(issue):
+    """
+    Maps Jira issue fields to the dict expected by predict().
+    The description is used as a stand-in for comments.
+    """
+    fields = issue.get('fields', {})
+    return {
+        "Summary": fields.get('summary', ''),
+        "Comments": str(fields.get('description', ''))
+    }
+
+def load_examples_index():
+    """
+    Root cause -> ranked historical defects, precomputed by preprocess.py.
+    """
+    try:
+        examples_index = registry.get("examples_index")
+        print("Historical examples index loaded successfully.")
+        return examples_index
+    except FileNotFoundError as e:
+        # Either the examples index or the raw data it is built from.
+        missing = e.filename or "paths.examples_index / paths.raw_data"
+        print(f"Error: {missing} not found. Cannot provide historical context.")
+        return None
+
+def find_similar_defects(issue_details, k=3):
+    """
+    Nearest historical defects for every issue, from a single batched encode
+    and index search (IssueFinder.find_similar_batch). Returns
+    {position in issue_details: [(Defect_ID, distance), ...]}, or None when
+    the vector index has not been built.
+    """
+    base_dir = os.path.dirname(os.path.dirname(__file__))
+    index_file = os.path.join(base_dir, 'vector_index', 'diji_ai.index')
+    mapping_file = os.path.join(base_dir, 'vector_index', 'data_mapping')
+    if not os.path.exists(index_file):
+        print("Vector index not found, skipping similar defects. Run `src/build_vector_index.py` to add them.")
+        return None
+
+    from sentence_transformers import SentenceTransformer
+    from find_similar_issues import IssueFinder
+    from embedding_cache.cache import get_embedding_cache
+
+    finder = IssueFinder(index_file, mapping_file, SentenceTransformer('all-MiniLM-L6-v2'),
+                         embedding_cache=get_embedding_cache('all-MiniLM-L6-v2'))
+    # Same Summary + Comments text the index was built from.
+    queries = [f"{details['Summary']} {details['Comments']}" for details in issue_details]
+    print(f"Searching similar defects for {len(queries)} issues in one batch...")
+    hits = finder.find_similar_batch(queries, k=k)
+    similar = {}
+    for query_index, defect_id, distance in zip(hits['query_index'], hits['Defect_ID'], hits['distance']):
+        similar.setdefault(int(query_index), []).append((defect_id, float(distance)))
+    return similar
+
+def bulk_score(issues, examples_index, output_path, batch_size=1024, similar_k=3):
+    """
+    Scores a whole backlog offline and writes the results for review.
+
+    Every issue is tokenized and padded in one pass and scored in batches of
+    batch_size. The similar_k nearest historical defects of every issue come
+    from one batched vector search (skipped when similar_k is 0 or the index
+    is missing). Nothing is posted to Jira. The output format follows the
+    file extension: .parquet (requires pyarrow) or .csv.
+    """
+    issue_details = [issue_details_from_jira(issue) for issue in issues]
+    print(f"Scoring {len(issues)} issues in batches of {batch_size}...")
+    predictions = predict_batch(issue_details, batch_size=batch_size)
+    similar = find_similar_defects(issue_details, k=similar_k) if similar_k else None
+
+    rows = []
+    for i, (issue, preds) in enumerate(zip(issues, predictions)):
+        row = {"issue_key": issue['key']}
+        for rank, (label, score) in enumerate(preds, start=1):
+            row[f"label_{rank}"] = label
+            row[f"score_{rank}"] = score
+        examples = examples_index.lookup(preds[0][0], n=3)
+        row["example_defect_ids"] = ";".join(str(e['Defect_ID']) for e in examples)
+        row["example_summaries"] = " || ".join(str(e['Summary']) for e in examples)
+        if similar is not None:
+            hits = similar.get(i, [])
+            row["similar_defect_ids"] = ";".join(str(defect_id) for defect_id, _ in hits)
+            row["similar_distances"] = ";".join(f"{distance:.4f}" for _, distance in hits)
+        rows.append(row)
+
+    results = pd.DataFrame(rows)
+    if output_path.endswith('.parquet'):
+        results.to_parquet(output_path, index=False)
+    else:
+        results.to_csv(output_path, index=False)
+    print(f"Wrote {len(results)} scored issues to {output_path}")
+    return results
+
 def run_and_update_jira():
     """
     Fetches issues from Jira, predicts their root cause, and posts the analysis as a comment.
     """
     print("Loading historical data for context...")
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    raw_data_path = os.path.join(project_root, 'data', 'raw_data.csv')
-    try:
-        context_df = pd.read_csv(raw_data_path)
-        print("Historical data loaded successfully.")
-    except FileNotFoundError:
-        print("Error: raw_data.csv not found. Cannot provide historical context.")
+    examples_index = load_examples_index()
+    if examples_index is None:
         return
 
     # JQL to fetch issues. Modify this to target the desired issues.
@@ -64,19 +154,14 @@ def run_and_update_jira():
             print(f"\n--- Processing Issue: {issue_key} ---")
 
             # The predict function expects a dict with 'Summary' and 'Comments'
-            # We need to map the Jira issue fields to this format.
-            # We'll use the 'summary' and 'description' fields.
-            issue_details = {
-                "Summary": issue.get('fields', {}).get('summary', ''),
-                "Comments": str(issue.get('fields', {}).get('description', '')) # Using description as a stand-in for comments
-            }
+            issue_details = issue_details_from_jira(issue)
 
             # 1. Get prediction
             predictions = predict(issue_details)
             top_label = predictions[0][0]
             
             # 2. Get context
-            examples = context_df[context_df['Root_Cause'] == top_label].head(3)
+            examples = examples_index.lookup(top_label, n=3)
 
             # 3. Format comment
             comment_body = format_comment(predictions, examples)
@@ -97,5 +182,34 @@ def run_and_update_jira():
         print("Please ensure your Jira domain, email, and API token in 'config.yaml' are correct.")
 
 
+def run_bulk_scoring(output_path, jql="status=Closed", batch_size=1024, similar_k=3):
+    """
+    Fetches issues for the JQL and scores them offline with `bulk_score`.
+    """
+    print("Loading historical data for context...")
+    examples_index = load_examples_index()
+    if examples_index is None:
+        return
+
+    print(f"Fetching Jira issues with JQL: '{jql}'...")
+    issues = fetch_closed_defects(jql=jql).get('issues', [])
+    if not issues:
+        print("No issues found for the given JQL query.")
+        return
+    return bulk_score(issues, examples_index, output_path, batch_size=batch_size, similar_k=similar_k)
+
+
 if __name__ == "__main__":
-    run_and_update_jira()
+    parser = argparse.ArgumentParser(description="Predict root causes for Jira issues.")
+    parser.add_argument("--bulk", metavar="OUTPUT",
+                        help="Score offline and write results to OUTPUT (.csv or .parquet) instead of commenting.")
+    parser.add_argument("--jql", default="status=Closed")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--similar", type=int, default=3, metavar="K",
+                        help="Nearest historical defects per issue in --bulk mode (0 to skip the vector search).")
+    args = parser.parse_args()
+
+    if args.bulk:
+        run_bulk_scoring(args.bulk, jql=args.jql, batch_size=args.batch_size, similar_k=args.similar)
+    else:
+        run_and_update_jira()
@@ -1,6 +1,11 @@
 import os
+import sys
+import time
+import shutil
+import hashlib
 import yaml
 import pandas as pd
+import numpy as np
 import joblib
 from sklearn.preprocessing import LabelEncoder
 
@@ -10,81 +15,208 @@ from tensorflow.keras.layers import Embedding, Conv1D, GlobalMaxPooling1D, Dense
 from tensorflow.keras.preprocessing.text import Tokenizer
 from tensorflow.keras.preprocessing.sequence import pad_sequences
 
+sys.path.append(os.path.dirname(__file__))
+from artifacts import atomic_write
 
-def train_cnn():
+
+# cnn_model settings that change the trained model. Export and cache settings
+# (quantization, sequence_cache_keep) are not among them.
+TRAINING_PARAM_KEYS = ("vocab_size", "embedding_dim", "max_length", "num_epochs", "batch_size", "target_column",
+                       "validation_split", "early_stopping_patience", "mixed_precision", "jit_compile")
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
     """
-    Trains a CNN model for text classification.
+    Reports wall time and training throughput for every epoch.
     """
-    # --- 1. Load Config and Set Paths ---
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    config_path = os.path.join(project_root, "config.yaml")
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
 
-    # Get paths and parameters from config
-    processed_data_path = os.path.join(project_root, config["paths"]["processed_data"])
-    model_path = os.path.join(project_root, config["paths"]["cnn_model"])
-    tokenizer_path = os.path.join(project_root, config["paths"]["tokenizer"])
-    label_encoder_path = os.path.join(project_root, config["paths"]["label_encoder"])
-    
-    params = config["cnn_model"]
-    vocab_size = params["vocab_size"]
-    embedding_dim = params["embedding_dim"]
-    max_length = params["max_length"]
-    num_epochs = params["num_epochs"]
-    batch_size = params["batch_size"]
-    target_column = params["target_column"]
+    def __init__(self, num_samples):
+        super().__init__()
+        self.num_samples = num_samples
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start
+        self.epoch_times.append(seconds)
+        print(f"Epoch {epoch + 1}: {seconds:.1f}s, {self.num_samples / seconds:,.0f} samples/sec")
+
+
+def sequence_cache_key(processed_data_path, params):
+    """
+    Fingerprint of the processed data and every setting that shapes the
+    padded sequences, used to name the sequence cache entry.
+    """
+    digest = hashlib.sha256()
+    with open(processed_data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(f"{params['vocab_size']}|{params['max_length']}|{params['target_column']}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def prepare_sequences(processed_data_path, params, cache_dir):
+    """
+    Tokenizes, pads and label-encodes the processed data.
+
+    Results are cached under cache_dir/<data hash>, so a retrain on unchanged
+    data loads the padded sequences, tokenizer and label encoder instead of
+    re-tokenizing. Returns (X_padded, y_encoded, tokenizer, label_encoder).
+    """
+    entry_dir = os.path.join(cache_dir, sequence_cache_key(processed_data_path, params))
+    paths = {name: os.path.join(entry_dir, name) for name in ("X.npy", "y.npy", "tokenizer.joblib", "label_encoder.joblib")}
+    if all(os.path.exists(p) for p in paths.values()):
+        print(f"Loading cached padded sequences from {entry_dir}...")
+        return (np.load(paths["X.npy"]), np.load(paths["y.npy"]),
+                joblib.load(paths["tokenizer.joblib"]), joblib.load(paths["label_encoder.joblib"]))
 
-    # --- 2. Load and Preprocess Data ---
     print("Loading preprocessed data...")
+    target_column = params["target_column"]
     df = pd.read_csv(processed_data_path)
     df.dropna(subset=['text', target_column], inplace=True)
 
     X = df['text']
     y_text = df[target_column]
 
-    # --- 3. Tokenize Text ---
     print("Tokenizing text data...")
-    tokenizer = Tokenizer(num_words=vocab_size, oov_token="<OOV>")
+    tokenizer = Tokenizer(num_words=params["vocab_size"], oov_token="<OOV>")
     tokenizer.fit_on_texts(X)
     X_sequences = tokenizer.texts_to_sequences(X)
-    X_padded = pad_sequences(X_sequences, maxlen=max_length, padding='post', truncating='post')
+    X_padded = pad_sequences(X_sequences, maxlen=params["max_length"], padding='post', truncating='post')
 
-    # --- 4. Encode Labels ---
     print("Encoding labels...")
     label_encoder = LabelEncoder()
     y_encoded = label_encoder.fit_transform(y_text)
-    num_classes = len(label_encoder.classes_)
 
-    # --- 5. Build CNN Model ---
-    print("Building the CNN model...")
+    # Written to a temporary directory and renamed, so an interrupted run never leaves a partial entry.
+    tmp_dir = entry_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "X.npy"), X_padded)
+    np.save(os.path.join(tmp_dir, "y.npy"), y_encoded)
+    joblib.dump(tokenizer, os.path.join(tmp_dir, "tokenizer.joblib"))
+    joblib.dump(label_encoder, os.path.join(tmp_dir, "label_encoder.joblib"))
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    print(f"Cached padded sequences in {entry_dir}")
+    prune_cache_entries(cache_dir, keep=params.get("sequence_cache_keep", 3))
+    return X_padded, y_encoded, tokenizer, label_encoder
+
+
+def prune_cache_entries(cache_dir, keep):
+    """
+    Deletes all but the keep most recently written cache entries. Temporary
+    directories are left to the run that owns them.
+    """
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+               if not name.endswith(".tmp") and os.path.isdir(os.path.join(cache_dir, name))]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[keep:]:
+        print(f"Removing old cache entry {path}")
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def make_datasets(X, y, batch_size, validation_split):
+    """
+    Builds prefetching tf.data pipelines. Like Keras' validation_split, the
+    last fraction of the rows is held out for validation.
+    """
+    num_val = int(len(X) * validation_split)
+    num_train = len(X) - num_val
+    train_ds = (tf.data.Dataset.from_tensor_slices((X[:num_train], y[:num_train]))
+                .shuffle(min(num_train, 10000), reshuffle_each_iteration=True)
+                .batch(batch_size)
+                .prefetch(tf.data.AUTOTUNE))
+    val_ds = None
+    if num_val:
+        val_ds = (tf.data.Dataset.from_tensor_slices((X[num_train:], y[num_train:]))
+                  .batch(batch_size)
+                  .cache()
+                  .prefetch(tf.data.AUTOTUNE))
+    return train_ds, val_ds, num_train
+
+
+def build_model(params, num_classes):
     model = Sequential([
-        Embedding(input_dim=vocab_size, output_dim=embedding_dim, input_length=max_length),
+        Embedding(input_dim=params["vocab_size"], output_dim=params["embedding_dim"], input_length=params["max_length"]),
         Conv1D(128, 5, activation='relu'),
         GlobalMaxPooling1D(),
         Dense(64, activation='relu'),
-        Dense(num_classes, activation='softmax')
+        # Keep the softmax in float32 when training with mixed precision.
+        Dense(num_classes, activation='softmax', dtype='float32')
     ])
 
     model.compile(optimizer='adam',
                   loss='sparse_categorical_crossentropy',
-                  metrics=['accuracy'])
-    
+                  metrics=['accuracy'],
+                  jit_compile=params.get("jit_compile", False))
+    return model
+
+
+def train_cnn(config=None):
+    """
+    Trains a CNN model for text classification.
+    """
+    # --- 1. Load Config and Set Paths ---
+    project_root = os.path.dirname(os.path.dirname(__file__))
+    if config is None:
+        config_path = os.path.join(project_root, "config.yaml")
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+
+    # Get paths and parameters from config
+    processed_data_path = os.path.join(project_root, config["paths"]["processed_data"])
+    model_path = os.path.join(project_root, config["paths"]["cnn_model"])
+    tokenizer_path = os.path.join(project_root, config["paths"]["tokenizer"])
+    label_encoder_path = os.path.join(project_root, config["paths"]["label_encoder"])
+    cache_dir = os.path.join(project_root, config["paths"].get("sequence_cache", "cache/sequences"))
+
+    params = config["cnn_model"]
+    num_epochs = params["num_epochs"]
+    batch_size = params["batch_size"]
+
+    if params.get("mixed_precision"):
+        # "mixed_bfloat16" is the variant that helps on recent CPUs.
+        tf.keras.mixed_precision.set_global_policy(params["mixed_precision"])
+        print(f"Using mixed precision policy: {params['mixed_precision']}")
+
+    # --- 2. Tokenize Text and Encode Labels (cached by data hash) ---
+    X_padded, y_encoded, tokenizer, label_encoder = prepare_sequences(processed_data_path, params, cache_dir)
+    num_classes = len(label_encoder.classes_)
+
+    # --- 3. Build Input Pipeline ---
+    train_ds, val_ds, num_train = make_datasets(X_padded, y_encoded, batch_size, params.get("validation_split", 0.2))
+
+    # --- 4. Build CNN Model ---
+    print("Building the CNN model...")
+    model = build_model(params, num_classes)
     model.summary()
 
-    # --- 6. Train Model ---
+    # --- 5. Train Model ---
     print("Training the model...")
-    model.fit(X_padded, y_encoded, epochs=num_epochs, batch_size=batch_size, validation_split=0.2)
+    timer = EpochTimer(num_train)
+    callbacks = [timer]
+    if val_ds is not None:
+        callbacks.append(tf.keras.callbacks.EarlyStopping(
+            monitor='val_loss', patience=params.get("early_stopping_patience", 2), restore_best_weights=True))
+    history = model.fit(train_ds, validation_data=val_ds, epochs=num_epochs, callbacks=callbacks)
+
+    total_seconds = sum(timer.epoch_times)
+    print(f"Trained {len(history.epoch)} of {num_epochs} epochs in {total_seconds:.1f}s "
+          f"({num_train * len(history.epoch) / total_seconds:,.0f} samples/sec overall)")
 
-    # --- 7. Save Artifacts ---
+    # --- 6. Save Artifacts ---
     print("Saving model and supporting artifacts...")
-    model.save(model_path)
-    joblib.dump(tokenizer, tokenizer_path)
-    joblib.dump(label_encoder, label_encoder_path)
+    # Written to temporary files and renamed; retrain.py publishes them once every stage has passed.
+    atomic_write(model_path, model.save)
+    atomic_write(tokenizer_path, lambda p: joblib.dump(tokenizer, p))
+    atomic_write(label_encoder_path, lambda p: joblib.dump(label_encoder, p))
 
     print(f"Model saved to {model_path}")
     print(f"Tokenizer saved to {tokenizer_path}")
     print(f"Label Encoder saved to {label_encoder_path}")
 
 if __name__ == "__main__":
-    train_cnn()
\ No newline at end of file
+    train_cnn()
@@ -1,12 +1,32 @@
 import os
 import sys
-import pandas as pd
+import yaml
 
 # Add the DIJI_AI directory to the Python path to allow for module imports
 sys.path.append(os.path.dirname(__file__))
 
 from src.predict import predict
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from examples_index.index import load_or_build
+
+_examples_index = None
+
+def get_examples_index():
+    """
+    Root cause -> ranked historical defects, loaded once per process.
+    Built from paths.raw_data if preprocessing has not written it yet.
+    """
+    global _examples_index
+    if _examples_index is None:
+        base_dir = os.path.dirname(__file__)
+        with open(os.path.join(base_dir, "config.yaml"), 'r') as f:
+            paths = yaml.safe_load(f)["paths"]
+        _examples_index = load_or_build(
+            os.path.join(base_dir, paths.get("examples_index", "data/root_cause_examples.json")),
+            os.path.join(base_dir, paths["raw_data"]))
+    return _examples_index
+
 def generate_prediction_report(issue_details, output_file=None):
     report_lines = []
 
@@ -45,16 +65,16 @@ def generate_prediction_report(issue_details, output_file=None):
             print_to_report(f"     - {label}: {score:.4f}")
 
         # 5. Similar defects from historical data.
-        predictions_df = pd.read_csv(os.path.join(os.path.dirname(__file__), "data", "predictions_processed_data.csv"))
-        similar_defects = predictions_df[predictions_df['predicted_root_cause'] == top_predicted_root_cause]
+        similar_defects = get_examples_index().lookup(
+            top_predicted_root_cause, application=issue_details.get('Application'),
+            error_code=issue_details.get('Error_Code'), n=5)
         
         print_to_report(f"\n3. Similar Defects from Historical Data (Top 5 with RC '{top_predicted_root_cause}'):")
-        if not similar_defects.empty:
-            print_to_report("   Note: No explicit 'defect id' column found in historical data. Displaying all available columns.")
-            for index, row in similar_defects.head(5).iterrows():
-                print_to_report(f"   --- Defect {index + 1} (Original Index: {row.name}) ---") # Added original index as a pseudo-ID
-                for col in similar_defects.columns:
-                    print_to_report(f"     {col}: {row[col]}")
+        if similar_defects:
+            for i, row in enumerate(similar_defects, start=1):
+                print_to_report(f"   --- Defect {i} ---")
+                for col, value in row.items():
+                    print_to_report(f"     {col}: {value}")
         else:
             print_to_report("   No similar defects found in historical data.")
 
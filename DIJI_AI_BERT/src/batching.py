@@ -0,0 +1,120 @@
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+
+class PaddingStats:
+    """
+    Counts real and padding tokens seen by the model, to show how much
+    attention compute goes to padding.
+    """
+
+    def __init__(self, max_length=None):
+        self.max_length = max_length
+        self.reset()
+
+    def reset(self):
+        self.sequences = 0
+        self.batches = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def add(self, lengths, padded_length):
+        self.sequences += len(lengths)
+        self.batches += 1
+        self.real_tokens += int(sum(lengths))
+        self.padded_tokens += len(lengths) * padded_length
+
+    def add_batch(self, attention_mask):
+        """
+        Records a collated batch from its attention mask. Used when the
+        collator runs in DataLoader workers, whose counters the main process
+        never sees.
+        """
+        self.add(attention_mask.sum(dim=1).tolist(), attention_mask.shape[1])
+
+    @property
+    def padding_ratio(self):
+        return 1 - self.real_tokens / self.padded_tokens if self.padded_tokens else 0.0
+
+    def report(self, name):
+        line = (f"{name}: {self.sequences} sequences in {self.batches} batches, "
+                f"{self.real_tokens:,} real / {self.padded_tokens:,} processed tokens "
+                f"({self.padding_ratio:.1%} padding)")
+        if self.max_length and self.padded_tokens:
+            fixed = self.sequences * self.max_length
+            line += f"; padding to max_length={self.max_length} would process {fixed:,} ({fixed / self.padded_tokens:.1f}x)"
+        print(line)
+
+
+class DynamicPaddingCollator:
+    """
+    Pads each batch only to its longest sequence instead of to max_length.
+
+    Features are dicts with an unpadded 'input_ids' sequence and optional
+    'labels'; other keys are passed through as lists.
+    """
+
+    def __init__(self, pad_token_id, stats=None):
+        self.pad_token_id = pad_token_id
+        self.stats = stats
+
+    def __call__(self, features):
+        lengths = [len(f['input_ids']) for f in features]
+        padded_length = max(lengths)
+        input_ids = torch.full((len(features), padded_length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(features), padded_length), dtype=torch.long)
+        for i, (feature, length) in enumerate(zip(features, lengths)):
+            input_ids[i, :length] = torch.as_tensor(feature['input_ids'], dtype=torch.long)
+            attention_mask[i, :length] = 1
+        if self.stats is not None:
+            self.stats.add(lengths, padded_length)
+
+        batch = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'labels' in features[0]:
+            batch['labels'] = torch.as_tensor([f['labels'] for f in features], dtype=torch.long)
+        for key in features[0]:
+            if key not in batch and key != 'input_ids':
+                batch[key] = [f[key] for f in features]
+        return batch
+
+
+class LengthBucketSampler(Sampler):
+    """
+    Batch sampler that groups sequences of similar length.
+
+    With shuffle, indices are shuffled, cut into buckets of
+    batch_size * bucket_batches, sorted by length within each bucket and
+    split into batches, and the batches are shuffled again, so training
+    order stays random while little padding is needed. Without shuffle
+    (inference), all indices are sorted by length.
+    """
+
+    def __init__(self, lengths, batch_size, shuffle=True, bucket_batches=50, seed=42):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_batches = bucket_batches
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self):
+        if not self.shuffle:
+            order = np.argsort(self.lengths, kind='stable')
+            batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        else:
+            rng = np.random.default_rng(self.seed + self.epoch)
+            self.epoch += 1
+            order = rng.permutation(len(self.lengths))
+            bucket_size = self.batch_size * self.bucket_batches
+            batches = []
+            for start in range(0, len(order), bucket_size):
+                bucket = order[start:start + bucket_size]
+                bucket = bucket[np.argsort(self.lengths[bucket], kind='stable')]
+                batches.extend(bucket[i:i + self.batch_size] for i in range(0, len(bucket), self.batch_size))
+            rng.shuffle(batches)
+        for batch in batches:
+            yield batch.tolist()
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
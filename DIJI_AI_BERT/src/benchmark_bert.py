@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from predict_bert import BertPredictor, load_config, project_root
+
+
+def load_sample_texts(num_tickets, seed=42):
+    config = load_config()
+    texts = pd.read_csv(os.path.join(project_root, config["paths"]["processed_data"]))['text'].dropna()
+    return texts.sample(min(num_tickets, len(texts)), random_state=seed).tolist()
+
+
+def summarize(name, latencies_ms):
+    latencies_ms = np.asarray(latencies_ms)
+    print(f"{name:<28}{np.percentile(latencies_ms, 50):>10.1f}{np.percentile(latencies_ms, 99):>10.1f}"
+          f"{latencies_ms.mean():>10.1f}")
+
+
+def benchmark(num_tickets=50, batch_size=32):
+    """
+    Per-ticket latency of the old path (load tokenizer, model and label
+    encoder for every prediction) against one warm BertPredictor, single and
+    batched.
+    """
+    texts = load_sample_texts(num_tickets)
+    config = load_config()
+
+    # Before: every call paid for deserialization, as predict_root_cause used to.
+    cold = []
+    for text in texts[:min(5, len(texts))]:
+        start = time.perf_counter()
+        BertPredictor.from_config(config).predict(text)
+        cold.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    predictor = BertPredictor.from_config(config)
+    load_seconds = time.perf_counter() - start
+    predictor.predict(texts[0])  # first call allocates kernels and caches
+
+    warm = []
+    for text in texts:
+        start = time.perf_counter()
+        predictor.predict(text)
+        warm.append((time.perf_counter() - start) * 1000)
+
+    predictor.padding_stats.reset()
+    start = time.perf_counter()
+    predictor.predict_batch(texts, batch_size=batch_size)
+    batched = (time.perf_counter() - start) * 1000 / len(texts)
+
+    print(f"\nDevice: {predictor.device}, max_length: {predictor.max_length}, one-time load: {load_seconds:.2f}s")
+    print(f"{'per-ticket latency (ms)':<28}{'p50':>10}{'p99':>10}{'mean':>10}")
+    summarize("reload per call (before)", cold)
+    summarize("warm predictor (after)", warm)
+    print(f"{f'warm, batch_size={batch_size}':<28}{'':>10}{'':>10}{batched:>10.1f}")
+    predictor.padding_stats.report("Batched inference tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-ticket BERT prediction latency.")
+    parser.add_argument("--tickets", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+    benchmark(args.tickets, args.batch_size)
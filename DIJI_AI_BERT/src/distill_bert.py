@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import joblib
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from torch.optim import AdamW
+from transformers import BertTokenizerFast, BertForSequenceClassification, get_linear_schedule_with_warmup
+
+sys.path.append(os.path.dirname(__file__))
+from batching import DynamicPaddingCollator, LengthBucketSampler, PaddingStats
+from predict_bert import BertPredictor, load_config, project_root
+from token_cache import TokenCache, load_processed_data, pretokenize
+from train_bert import JiraTicketDataset, split_indices
+
+DEFAULT_DISTILLATION_PARAMS = {
+    "student_model_name": "nreimers/MiniLM-L6-H384-uncased",
+    "student_layers": 4,
+    "temperature": 2.0,
+    "alpha": 0.9,
+    "batch_size": 32,
+    "num_epochs": 5,
+    "learning_rate": 1e-4,
+}
+
+
+def load_distillation_config(config):
+    params = dict(DEFAULT_DISTILLATION_PARAMS)
+    params.update(config.get("distillation") or {})
+    return params
+
+
+class DistillationDataset(JiraTicketDataset):
+    """
+    JiraTicketDataset that also returns the teacher's logits for each ticket.
+    """
+
+    def __init__(self, token_cache, indices, labels, teacher_logits):
+        super().__init__(token_cache, indices, labels)
+        self.teacher_logits = teacher_logits
+
+    def __getitem__(self, item):
+        features = super().__getitem__(item)
+        features['teacher_logits'] = self.teacher_logits[item]
+        return features
+
+
+def distillation_loss(student_logits, teacher_logits, labels, temperature, alpha):
+    """
+    alpha * T^2 * KL(teacher || student) on temperature-softened logits, plus
+    (1 - alpha) * cross-entropy on the true labels. The T^2 factor keeps the
+    soft-label gradients on the same scale as the hard-label ones.
+    """
+    soft_loss = F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=1),
+        F.softmax(teacher_logits / temperature, dim=1),
+        reduction="batchmean",
+    ) * temperature ** 2
+    hard_loss = F.cross_entropy(student_logits, labels)
+    return alpha * soft_loss + (1 - alpha) * hard_loss
+
+
+def compute_teacher_logits(teacher, dataset, collator, batch_size, num_workers, device):
+    """
+    Runs the teacher once over the dataset, batched by length, and returns its
+    logits in dataset order, shape (len(dataset), num_classes).
+    """
+    batches = list(LengthBucketSampler(dataset.lengths, batch_size, shuffle=False))
+    loader = DataLoader(dataset, batch_sampler=batches, collate_fn=collator, num_workers=num_workers)
+    logits = np.zeros((len(dataset), teacher.config.num_labels), dtype='float32')
+    teacher.eval()
+    with torch.inference_mode():
+        for indices, batch in zip(batches, loader):
+            logits[indices] = teacher(input_ids=batch["input_ids"].to(device),
+                                      attention_mask=batch["attention_mask"].to(device)).logits.float().cpu().numpy()
+    return logits
+
+
+def count_parameters(model_path):
+    return sum(p.numel() for p in BertForSequenceClassification.from_pretrained(model_path).parameters())
+
+
+def evaluate_on_cpu(model_path, label_encoder_path, max_length, texts, labels, batch_size=32, num_threads=None):
+    """
+    Validation accuracy, single-ticket latency and batched throughput of an
+    fp32 model directory through BertPredictor on CPU.
+    """
+    predictor = BertPredictor(model_path, label_encoder_path, max_length=max_length, device="cpu", num_threads=num_threads)
+    predictor.predict(texts[0])  # warm-up
+
+    start = time.perf_counter()
+    probabilities = predictor.predict_proba(texts, batch_size=batch_size)
+    throughput = len(texts) / (time.perf_counter() - start)
+    accuracy = float(np.mean(predictor.labels[probabilities.argmax(axis=1)] == np.asarray(labels)))
+
+    latencies = []
+    for text in texts[:min(50, len(texts))]:
+        start = time.perf_counter()
+        predictor.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "parameters": count_parameters(model_path),
+        "accuracy": accuracy,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "tickets_per_second": throughput,
+    }
+
+
+def distill_bert():
+    """
+    Trains a small BERT student on the fine-tuned teacher's soft logits and
+    saves it to paths.bert_student in the same format as the teacher, so
+    predict_bert can serve it by setting serving.model to 'bert_student'.
+    """
+    # --- 1. Load Config and Set Paths ---
+    config = load_config()
+    paths = config["paths"]
+    teacher_params = config["bert_model"]
+    params = load_distillation_config(config)
+
+    processed_data_path = os.path.join(project_root, paths["processed_data"])
+    teacher_path = os.path.join(project_root, paths["bert_model"])
+    student_path = os.path.join(project_root, paths["bert_student"])
+    label_encoder_path = os.path.join(project_root, paths["label_encoder"])
+
+    MAX_LEN = teacher_params["max_length"]
+    BATCH_SIZE = params["batch_size"]
+    EPOCHS = params["num_epochs"]
+    TEMPERATURE = float(params["temperature"])
+    ALPHA = float(params["alpha"])
+    target_column = teacher_params["target_column"]
+    num_workers = teacher_params.get("num_workers", min(4, os.cpu_count() or 1))
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # --- 2. Load Data (same token cache and split as train_bert.py) ---
+    # The student shares the teacher's uncased WordPiece vocabulary, so both read the same token ids.
+    tokenizer = BertTokenizerFast.from_pretrained(teacher_path)
+    cache_dir = os.path.join(project_root, paths.get("token_cache", "cache/tokens"))
+    token_cache = TokenCache(pretokenize(processed_data_path, tokenizer, MAX_LEN, target_column, cache_dir,
+                                         keep=teacher_params.get("token_cache_keep", 3)))
+    label_encoder = joblib.load(label_encoder_path)
+    labels_encoded = label_encoder.transform(token_cache.targets)
+    num_classes = len(label_encoder.classes_)
+    train_indices, val_indices = split_indices(token_cache.targets)
+
+    collator = DynamicPaddingCollator(tokenizer.pad_token_id)
+    train_base = JiraTicketDataset(token_cache, train_indices, labels_encoded[train_indices])
+    val_dataset = JiraTicketDataset(token_cache, val_indices, labels_encoded[val_indices])
+
+    # --- 3. Teacher Soft Logits ---
+    print(f"Computing teacher logits with {teacher_path}...")
+    start = time.perf_counter()
+    teacher = BertForSequenceClassification.from_pretrained(teacher_path).to(device)
+    teacher_logits = compute_teacher_logits(teacher, train_base, collator, BATCH_SIZE, num_workers, device)
+    del teacher
+    print(f"Teacher logits for {len(train_base)} tickets in {time.perf_counter() - start:.1f}s")
+
+    train_dataset = DistillationDataset(token_cache, train_indices, labels_encoded[train_indices], teacher_logits)
+    loader_options = {
+        "num_workers": num_workers,
+        "persistent_workers": num_workers > 0,
+        "pin_memory": torch.cuda.is_available(),
+        "collate_fn": collator,
+    }
+    train_data_loader = DataLoader(
+        train_dataset,
+        batch_sampler=LengthBucketSampler(train_dataset.lengths, BATCH_SIZE, shuffle=True),
+        **loader_options
+    )
+    val_data_loader = DataLoader(
+        val_dataset,
+        batch_sampler=LengthBucketSampler(val_dataset.lengths, BATCH_SIZE, shuffle=False),
+        **loader_options
+    )
+
+    # --- 4. Build Student Model ---
+    print(f"Loading student: first {params['student_layers']} layers of {params['student_model_name']}")
+    student = BertForSequenceClassification.from_pretrained(
+        params["student_model_name"],
+        num_labels=num_classes,
+        num_hidden_layers=params["student_layers"],
+    )
+    if student.config.vocab_size != tokenizer.vocab_size:
+        raise ValueError(f"Student vocabulary ({student.config.vocab_size}) does not match the teacher tokenizer "
+                         f"({tokenizer.vocab_size}); pick an uncased BERT-vocabulary student.")
+    student = student.to(device)
+
+    optimizer = AdamW(student.parameters(), lr=float(params["learning_rate"]))
+    total_steps = len(train_data_loader) * EPOCHS
+    scheduler = get_linear_schedule_with_warmup(
+        optimizer,
+        num_warmup_steps=int(0.1 * total_steps),
+        num_training_steps=total_steps
+    )
+
+    # --- 5. Distill ---
+    print("Starting distillation...")
+    train_stats = PaddingStats(MAX_LEN)
+    for epoch in range(EPOCHS):
+        print(f'Epoch {epoch + 1}/{EPOCHS}')
+        print('-' * 10)
+
+        student.train()
+        train_stats.reset()
+        epoch_start = time.perf_counter()
+        total_loss = 0
+        for batch in train_data_loader:
+            train_stats.add_batch(batch["attention_mask"])
+            logits = student(
+                input_ids=batch["input_ids"].to(device),
+                attention_mask=batch["attention_mask"].to(device)
+            ).logits
+            loss = distillation_loss(
+                logits,
+                torch.as_tensor(np.stack(batch["teacher_logits"])).to(device),
+                batch["labels"].to(device),
+                TEMPERATURE,
+                ALPHA,
+            )
+            total_loss += loss.item()
+
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(student.parameters(), max_norm=1.0)
+            optimizer.step()
+            scheduler.step()
+
+        print(f"Distillation loss: {total_loss / len(train_data_loader)}")
+        print(f"Epoch time: {time.perf_counter() - epoch_start:.1f}s")
+        train_stats.report("Train tokens")
+
+        student.eval()
+        correct_predictions = 0
+        total_predictions = 0
+        with torch.no_grad():
+            for batch in val_data_loader:
+                labels = batch["labels"].to(device)
+                predictions = torch.argmax(student(
+                    input_ids=batch["input_ids"].to(device),
+                    attention_mask=batch["attention_mask"].to(device)
+                ).logits, dim=1)
+                correct_predictions += torch.sum(predictions == labels).item()
+                total_predictions += labels.size(0)
+        print(f"Validation Accuracy: {correct_predictions / total_predictions:.4f}")
+
+    # --- 6. Save Student ---
+    # Same layout as the teacher; the teacher's label encoder applies unchanged.
+    student.save_pretrained(student_path)
+    tokenizer.save_pretrained(student_path)
+    print(f"Student saved to {student_path}")
+
+    # --- 7. Accuracy vs Latency Report ---
+    val_df = load_processed_data(processed_data_path, target_column).iloc[val_indices]
+    val_texts = val_df['text'].astype(str).tolist()
+    val_labels = val_df[target_column].tolist()
+    num_threads = config.get("serving", {}).get("num_threads")
+    report = {}
+    for name, model_path in (("teacher", teacher_path), ("student", student_path)):
+        print(f"Evaluating {name} on CPU...")
+        report[name] = evaluate_on_cpu(model_path, label_encoder_path, MAX_LEN, val_texts, val_labels,
+                                       num_threads=num_threads)
+
+    print(f"\n{'model':<10}{'params':>12}{'accuracy':>10}{'p50 ms':>10}{'p99 ms':>10}{'tickets/s':>11}")
+    for name, row in report.items():
+        print(f"{name:<10}{row['parameters']:>12,}{row['accuracy']:>10.4f}{row['p50_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['tickets_per_second']:>11.1f}")
+    speedup = report["teacher"]["p50_ms"] / report["student"]["p50_ms"]
+    print(f"Student is {speedup:.1f}x faster per ticket, "
+          f"{report['teacher']['accuracy'] - report['student']['accuracy']:+.4f} accuracy vs the teacher.")
+    print("Set serving.model: \"bert_student\" in config.yaml to serve it.")
+
+    report_path = os.path.join(project_root, "distillation_report.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    distill_bert()
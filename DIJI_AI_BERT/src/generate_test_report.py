@@ -1,9 +1,10 @@
 import os
+import sys
 import yaml
-import joblib
-import torch
 import pandas as pd
-from transformers import BertTokenizer, BertForSequenceClassification
+
+sys.path.append(os.path.dirname(__file__))
+from predict_bert import get_predictor
 
 def generate_report(test_text: str, test_app: str, search_rc: str):
     """
@@ -20,36 +21,12 @@ def generate_report(test_text: str, test_app: str, search_rc: str):
         config = yaml.safe_load(f)
 
     paths = config["paths"]
-    params = config["bert_model"]
-
-    model_path = os.path.join(project_root, paths["bert_model"])
-    label_encoder_path = os.path.join(project_root, paths["label_encoder"])
     raw_data_path = os.path.join(project_root, paths["raw_data"])
     report_file_path = os.path.join(project_root, "test_report.txt")
 
     # --- 1. Prediction Details ---
-    print("Loading model and making prediction...")
-    tokenizer = BertTokenizer.from_pretrained(model_path)
-    model = BertForSequenceClassification.from_pretrained(model_path)
-    label_encoder = joblib.load(label_encoder_path)
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = model.to(device)
-    model.eval()
-
-    encoding = tokenizer.encode_plus(
-        test_text, return_tensors='pt', max_length=params["max_length"], padding='max_length', truncation=True
-    )
-    input_ids = encoding['input_ids'].to(device)
-    attention_mask = encoding['attention_mask'].to(device)
-
-    with torch.no_grad():
-        outputs = model(input_ids=input_ids, attention_mask=attention_mask)
-        logits = outputs.logits
-        probabilities = torch.softmax(logits, dim=1)
-        confidence, predicted_idx = torch.max(probabilities, dim=1)
-
-    predicted_confidence = confidence.cpu().numpy()[0]
-    predicted_label = label_encoder.inverse_transform([predicted_idx.cpu().numpy()[0]])[0]
+    print("Making prediction...")
+    predicted_label, predicted_confidence = get_predictor().predict(test_text, top_k=1)[0]
 
     # --- 2. Similar Defects from Historical Data ---
     print("Searching for similar historical defects...")
@@ -95,8 +72,6 @@ def generate_report(test_text: str, test_app: str, search_rc: str):
 
 
 if __name__ == "__main__":
-    import sys
-
     if len(sys.argv) != 4:
         print("Usage: python generate_test_report.py <path_to_issue_file> <test_case_app> <search_for_rc>")
         sys.exit(1)
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import torch
+from transformers import BertTokenizerFast, BertForSequenceClassification
+
+sys.path.append(os.path.dirname(__file__))
+from predict_bert import (BACKENDS, BACKEND_PATH_KEYS, EXPORT_SOURCE_FILE, INT8_WEIGHTS_FILE, ONNX_MODEL_FILE,
+                          BertPredictor, load_config, project_root, quantize_int8, serving_model_key,
+                          serving_model_path)
+from token_cache import load_processed_data
+from train_bert import split_indices
+
+
+class _LogitsOnly(torch.nn.Module):
+    """
+    Wraps the classifier so the exported graph has a single 'logits' output.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_int8(model_path, output_dir):
+    """
+    Saves a dynamically int8-quantized copy of the fp32 model. The directory
+    holds the model config, the tokenizer and the quantized state dict.
+    """
+    print("Quantizing Linear layers to int8...")
+    model = BertForSequenceClassification.from_pretrained(model_path).eval()
+    quantized = quantize_int8(model)
+    os.makedirs(output_dir, exist_ok=True)
+    model.config.save_pretrained(output_dir)
+    BertTokenizerFast.from_pretrained(model_path).save_pretrained(output_dir)
+    torch.save(quantized.state_dict(), os.path.join(output_dir, INT8_WEIGHTS_FILE))
+    size_mb = os.path.getsize(os.path.join(output_dir, INT8_WEIGHTS_FILE)) / 1e6
+    print(f"int8 model saved to {output_dir} ({size_mb:.0f} MB)")
+
+
+def export_onnx(model_path, output_dir, opset=14):
+    """
+    Exports the fp32 model to ONNX with dynamic batch and sequence axes, then
+    runs the ONNX Runtime transformer optimizer, which fuses attention, layer
+    norm and GELU subgraphs into single kernels.
+    """
+    from onnxruntime.transformers import optimizer
+
+    model = BertForSequenceClassification.from_pretrained(model_path).eval()
+    tokenizer = BertTokenizerFast.from_pretrained(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+    raw_path = os.path.join(output_dir, "model_raw.onnx")
+
+    print("Exporting ONNX graph...")
+    sample = tokenizer(["export sample"], return_tensors="pt", return_token_type_ids=False)
+    axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        _LogitsOnly(model),
+        (sample["input_ids"], sample["attention_mask"]),
+        raw_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": {0: "batch"}},
+        opset_version=opset,
+    )
+
+    print("Fusing attention with the ONNX Runtime transformer optimizer...")
+    optimized = optimizer.optimize_model(
+        raw_path,
+        model_type="bert",
+        num_heads=model.config.num_attention_heads,
+        hidden_size=model.config.hidden_size,
+    )
+    fused = {op: count for op, count in optimized.get_fused_operator_statistics().items() if count}
+    print(f"Fused operators: {fused}")
+    optimized.save_model_to_file(os.path.join(output_dir, ONNX_MODEL_FILE))
+    os.remove(raw_path)
+    tokenizer.save_pretrained(output_dir)
+    print(f"ONNX model saved to {output_dir}")
+
+
+def record_export_source(output_dir, config):
+    """
+    Records which serving.model the export was made from, so BertPredictor
+    refuses an export whose source no longer matches the config.
+    """
+    with open(os.path.join(output_dir, EXPORT_SOURCE_FILE), 'w') as f:
+        json.dump({"model": serving_model_key(config), "path": serving_model_path(config)}, f)
+
+
+def export_all(config):
+    paths = config["paths"]
+    model_path = serving_model_path(config)
+    for backend, export in (("torch_int8", export_int8), ("onnx", export_onnx)):
+        output_dir = os.path.join(project_root, paths[BACKEND_PATH_KEYS[backend]])
+        # Cleared first, so an interrupted export is never taken for the previous one.
+        if os.path.exists(os.path.join(output_dir, EXPORT_SOURCE_FILE)):
+            os.remove(os.path.join(output_dir, EXPORT_SOURCE_FILE))
+        export(model_path, output_dir)
+        record_export_source(output_dir, config)
+
+
+def load_validation_split(config):
+    """
+    Texts and labels of the validation split used by train_bert.py.
+    """
+    target_column = config["bert_model"]["target_column"]
+    df = load_processed_data(os.path.join(project_root, config["paths"]["processed_data"]), target_column)
+    _, val_indices = split_indices(df[target_column].tolist())
+    val_df = df.iloc[val_indices]
+    return val_df['text'].astype(str).tolist(), val_df[target_column].tolist()
+
+
+def check_parity(config, backends, batch_size=32):
+    """
+    Runs every backend on the validation split and compares it with the fp32
+    model: accuracy, top-1 agreement and the largest probability difference.
+    Returns {backend: passed}, using serving.parity_min_agreement as the bar.
+    """
+    texts, labels = load_validation_split(config)
+    min_agreement = config.get("serving", {}).get("parity_min_agreement", 0.99)
+    print(f"\nParity on {len(texts)} validation tickets (min top-1 agreement {min_agreement:.1%})")
+    print(f"{'backend':<12}{'accuracy':>10}{'agreement':>11}{'max |dp|':>10}")
+
+    reference = None
+    passed = {}
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        predictor = BertPredictor.from_config(config, backend=backend)
+        if predictor.backend != backend:
+            continue
+        probabilities = predictor.predict_proba(texts, batch_size=batch_size)
+        predictions = predictor.labels[probabilities.argmax(axis=1)]
+        accuracy = float(np.mean(predictions == np.asarray(labels)))
+        if reference is None:
+            reference = probabilities
+        agreement = float(np.mean(probabilities.argmax(axis=1) == reference.argmax(axis=1)))
+        max_diff = float(np.abs(probabilities - reference).max())
+        passed[backend] = agreement >= min_agreement
+        status = "" if passed[backend] else "  FAIL"
+        print(f"{backend:<12}{accuracy:>10.4f}{agreement:>11.2%}{max_diff:>10.4f}{status}")
+    return passed
+
+
+def benchmark_backends(config, backends, thread_counts, num_tickets=200, batch_size=32):
+    """
+    Single-ticket latency and batched throughput of every backend for each
+    intra-op thread count. Returns rows of
+    (backend, threads, p50_ms, p99_ms, tickets_per_second).
+    """
+    texts, _ = load_validation_split(config)
+    texts = texts[:num_tickets]
+    print(f"\nBenchmark on {len(texts)} validation tickets, batch_size={batch_size}")
+    print(f"{'backend':<12}{'threads':>8}{'p50 ms':>10}{'p99 ms':>10}{'tickets/s':>11}")
+
+    results = []
+    for backend in backends:
+        for threads in thread_counts:
+            predictor = BertPredictor.from_config(config, backend=backend, num_threads=threads)
+            if predictor.backend != backend:
+                break
+            predictor.predict(texts[0])  # warm-up
+
+            latencies = []
+            for text in texts[:min(50, len(texts))]:
+                start = time.perf_counter()
+                predictor.predict(text)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            predictor.predict_batch(texts, batch_size=batch_size)
+            throughput = len(texts) / (time.perf_counter() - start)
+
+            row = (backend, threads, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99)), throughput)
+            results.append(row)
+            print(f"{backend:<12}{threads:>8}{row[2]:>10.1f}{row[3]:>10.1f}{throughput:>11.1f}")
+    return results
+
+
+def recommend_backend(results, passed, num_threads=None):
+    """
+    The backend with the lowest p50 latency among those that passed parity,
+    at the configured thread count when it was benchmarked.
+    """
+    candidates = [r for r in results if passed.get(r[0])]
+    if num_threads and any(r[1] == num_threads for r in candidates):
+        candidates = [r for r in candidates if r[1] == num_threads]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda r: r[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export int8/ONNX BERT models, check parity and benchmark CPU backends.")
+    parser.add_argument("--skip-export", action="store_true", help="Reuse previously exported models.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    config = load_config()
+    if not args.skip_export:
+        export_all(config)
+
+    passed = check_parity(config, args.backends, args.batch_size)
+    thread_counts = sorted(set(args.threads))
+    results = benchmark_backends(config, args.backends, thread_counts, args.tickets, args.batch_size)
+
+    serving = config.get("serving", {})
+    best = recommend_backend(results, passed, serving.get("num_threads"))
+    report_path = os.path.join(project_root, "bert_backends_report.json")
+    with open(report_path, 'w') as f:
+        json.dump({
+            "parity": passed,
+            "benchmark": [dict(zip(("backend", "threads", "p50_ms", "p99_ms", "tickets_per_second"), r)) for r in results],
+            "recommended_backend": best[0] if best else None,
+        }, f, indent=2)
+    print(f"\nReport saved to {report_path}")
+    if best:
+        print(f"Fastest backend passing parity: {best[0]} ({best[2]:.1f} ms p50 at {best[1]} threads). "
+              f"Set serving.backend: \"{best[0]}\" in config.yaml to use it "
+              f"(currently \"{serving.get('backend', 'torch')}\").")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,214 @@
 import os
+import sys
+import json
+import threading
 import yaml
 import joblib
+import numpy as np
 import torch
-from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import BertConfig, BertTokenizerFast, BertForSequenceClassification
+
+sys.path.append(os.path.dirname(__file__))
+from batching import DynamicPaddingCollator, LengthBucketSampler, PaddingStats
+
+project_root = os.path.dirname(os.path.dirname(__file__))
+
+
+def load_config():
+    config_path = os.path.join(project_root, "config.yaml")
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+# config.yaml paths key of each optimized backend's model directory.
+BACKEND_PATH_KEYS = {"torch_int8": "bert_model_int8", "onnx": "bert_model_onnx"}
+INT8_WEIGHTS_FILE = "quantized_weights.pt"
+ONNX_MODEL_FILE = "model.onnx"
+
+
+def quantize_int8(model):
+    """
+    Dynamic int8 quantization of the Linear layers (attention projections,
+    feed-forward and classifier), which hold nearly all of BERT's compute.
+    """
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+EXPORT_SOURCE_FILE = "export_source.json"
+
+
+def serving_model_key(config):
+    """
+    The paths key of the fp32 model to serve and to export optimized backends
+    from: 'bert_model' (the fine-tuned teacher) unless serving.model selects
+    the distilled 'bert_student'.
+    """
+    return config.get("serving", {}).get("model", "bert_model")
+
+
+def serving_model_path(config):
+    return os.path.join(project_root, config["paths"][serving_model_key(config)])
+
+
+def export_source(export_dir):
+    """
+    The serving.model an optimized export was made from, as recorded by
+    optimize_bert.py, or None for exports without the record.
+    """
+    try:
+        with open(os.path.join(export_dir, EXPORT_SOURCE_FILE), 'r') as f:
+            return json.load(f).get("model")
+    except (OSError, ValueError):
+        return None
+
+
+class BertPredictor:
+    """
+    Fine-tuned BERT root-cause classifier, loaded once and kept in eval mode.
+
+    Tokenizer, model and label encoder are read from disk in the constructor;
+    predict and predict_batch only tokenize and run the forward pass under
+    torch.inference_mode.
+
+    backend selects the model runtime: 'torch' (fp32 eager), 'torch_int8'
+    (dynamically quantized, CPU only) or 'onnx' (ONNX Runtime graph with fused
+    attention, CPU only). The int8 and ONNX artifacts are written by
+    src/optimize_bert.py; model_path points to the directory of the backend.
+    """
+
+    def __init__(self, model_path, label_encoder_path, max_length=512, device=None, backend="torch", num_threads=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        self.max_length = max_length
+        self.num_threads = num_threads
+        if backend != "torch":
+            device = "cpu"
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.tokenizer = BertTokenizerFast.from_pretrained(model_path)
+        self.model = self._load_model(model_path)
+        self.label_encoder = joblib.load(label_encoder_path)
+        self.labels = np.asarray(self.label_encoder.classes_)
+        # Tokens seen by the model, for the padding report.
+        self.padding_stats = PaddingStats(max_length)
+        self.collator = DynamicPaddingCollator(self.tokenizer.pad_token_id, self.padding_stats)
+
+    def _load_model(self, model_path):
+        if self.backend == "onnx":
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            return ort.InferenceSession(os.path.join(model_path, ONNX_MODEL_FILE), options,
+                                        providers=["CPUExecutionProvider"])
+        if self.backend == "torch_int8":
+            model = quantize_int8(BertForSequenceClassification(BertConfig.from_pretrained(model_path)))
+            model.load_state_dict(torch.load(os.path.join(model_path, INT8_WEIGHTS_FILE), map_location="cpu"))
+        else:
+            model = BertForSequenceClassification.from_pretrained(model_path)
+        model.to(self.device)
+        model.eval()
+        return model
+
+    @classmethod
+    def from_config(cls, config=None, **kwargs):
+        """
+        Builds the predictor for serving.backend in config.yaml. Falls back
+        to the fp32 model when the optimized artifact has not been exported,
+        or was exported from a different serving.model.
+        """
+        config = config or load_config()
+        paths = config["paths"]
+        serving = config.get("serving", {})
+        backend = kwargs.pop("backend", serving.get("backend", "torch"))
+        kwargs.setdefault("num_threads", serving.get("num_threads"))
+        model_path = serving_model_path(config)
+        if backend in BACKEND_PATH_KEYS:
+            optimized_path = os.path.join(project_root, paths[BACKEND_PATH_KEYS[backend]])
+            source = export_source(optimized_path) if os.path.isdir(optimized_path) else None
+            if source == serving_model_key(config):
+                model_path = optimized_path
+            else:
+                if not os.path.isdir(optimized_path):
+                    reason = "not found"
+                else:
+                    reason = f"was exported from '{source or 'an unknown model'}', not '{serving_model_key(config)}'"
+                print(f"Warning: {optimized_path} {reason}; run src/optimize_bert.py. Using the fp32 model.")
+                backend = "torch"
+        return cls(model_path,
+                   os.path.join(project_root, paths["label_encoder"]),
+                   max_length=config["bert_model"]["max_length"], backend=backend, **kwargs)
+
+    def _logits(self, encoding):
+        if self.backend == "onnx":
+            return torch.from_numpy(self.model.run(["logits"], {
+                "input_ids": encoding['input_ids'].numpy(),
+                "attention_mask": encoding['attention_mask'].numpy(),
+            })[0])
+        return self.model(input_ids=encoding['input_ids'].to(self.device),
+                          attention_mask=encoding['attention_mask'].to(self.device)).logits
+
+    def predict_proba(self, texts, batch_size=32):
+        """
+        Returns the class probabilities for a list of texts, shape (len(texts), num_classes).
+
+        Texts are tokenized once without padding, sorted by length and run in
+        batches padded only to their longest text; rows come back in input order.
+        """
+        texts = [str(text) for text in texts]
+        input_ids = self.tokenizer(
+            texts,
+            add_special_tokens=True,
+            max_length=self.max_length,
+            truncation=True,
+            return_token_type_ids=False,
+            return_attention_mask=False,
+        )['input_ids']
+        lengths = [len(ids) for ids in input_ids]
+
+        probabilities = np.zeros((len(texts), len(self.labels)), dtype='float32')
+        with torch.inference_mode():
+            for batch in LengthBucketSampler(lengths, batch_size, shuffle=False):
+                logits = self._logits(self.collator([{'input_ids': input_ids[i]} for i in batch]))
+                probabilities[batch] = torch.softmax(logits.float(), dim=1).cpu().numpy()
+        return probabilities
+
+    def predict_batch(self, texts, top_k=3, batch_size=32):
+        """
+        Returns one list of (label, probability) tuples per text, best first.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts, batch_size=batch_size)
+        top_indices = np.argsort(probabilities, axis=1)[:, ::-1][:, :top_k]
+        return [[(self.labels[i], float(row[i])) for i in indices]
+                for row, indices in zip(probabilities, top_indices)]
+
+    def predict(self, text, top_k=3):
+        return self.predict_batch([text], top_k=top_k)[0]
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    """
+    Returns the process-wide BertPredictor, loading it on first use.
+    """
+    global _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            print("Loading model, tokenizer, and label encoder...")
+            _predictor = BertPredictor.from_config()
+            print(f"Serving backend: {_predictor.backend}")
+        return _predictor
+
 
 def predict_root_cause(text: str) -> str:
     """
@@ -14,60 +220,14 @@ def predict_root_cause(text: str) -> str:
     Returns:
         The predicted root cause as a string.
     """
-    # --- 1. Load Config and Set Paths ---
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    config_path = os.path.join(project_root, "config.yaml")
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-
-    paths = config["paths"]
-    params = config["bert_model"]
-
-    model_path = os.path.join(project_root, paths["bert_model"])
-    label_encoder_path = os.path.join(project_root, paths["label_encoder"])
-    
-    # --- 2. Load Model, Tokenizer, and Label Encoder ---
-    print("Loading model, tokenizer, and label encoder...")
-    tokenizer = BertTokenizer.from_pretrained(model_path)
-    model = BertForSequenceClassification.from_pretrained(model_path)
-    label_encoder = joblib.load(label_encoder_path)
-    
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = model.to(device)
-    model.eval() # Set model to evaluation mode
-
-    # --- 3. Tokenize Input Text ---
-    encoding = tokenizer.encode_plus(
-        text,
-        add_special_tokens=True,
-        max_length=params["max_length"],
-        return_token_type_ids=False,
-        padding='max_length',
-        return_attention_mask=True,
-        return_tensors='pt',
-        truncation=True
-    )
-
-    input_ids = encoding['input_ids'].to(device)
-    attention_mask = encoding['attention_mask'].to(device)
-
-    # --- 4. Make Prediction ---
-    with torch.no_grad():
-        outputs = model(input_ids=input_ids, attention_mask=attention_mask)
-        logits = outputs.logits
-        prediction = torch.argmax(logits, dim=1).cpu().numpy()[0]
-
-    # --- 5. Decode Prediction ---
-    predicted_label = label_encoder.inverse_transform([prediction])[0]
-
-    return predicted_label
+    return get_predictor().predict(text, top_k=1)[0][0]
 
 if __name__ == "__main__":
     # Example Usage
     sample_text = "The login service is failing with a 500 internal server error. Users are unable to access their accounts. The logs show a null pointer exception in the authentication module."
-    
+
     predicted_cause = predict_root_cause(sample_text)
-    
+
     print("\n--- Prediction ---")
     print(f"Sample Text: \n\"{sample_text}\"")
-    print(f"\nPredicted Root Cause: {predicted_cause}")
\ No newline at end of file
+    print(f"\nPredicted Root Cause: {predicted_cause}")
@@ -1,12 +1,18 @@
-import pandas as pd
+import sys
 from predict import predict
 import yaml
 import os
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from examples_index.index import load_or_build
+
 # Load config
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
+project_root = os.path.dirname(os.path.dirname(__file__))
+config_path = os.path.join(project_root, "config.yaml")
 config = yaml.safe_load(open(config_path))
-raw_data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), config["paths"]["raw_data"])
+raw_data_path = os.path.join(project_root, config["paths"]["raw_data"])
+examples_index_path = os.path.join(project_root, config["paths"].get("examples_index", "data/root_cause_examples.json"))
+_examples_index = None
 
 # Mock issue for testing
 mock_issue = {
@@ -26,13 +32,16 @@ def predict_with_context(issue: dict):
     print(f"Prediction for new issue: {top_prediction_label} (Confidence: {top_prediction_prob:.2%})")
     print("-" * 20)
 
-    # Find similar issues
-    df = pd.read_csv(raw_data_path)
-    similar_issues = df[df["Root_Cause"] == top_prediction_label]
+    # Find similar issues in the precomputed examples index, loaded once per process
+    global _examples_index
+    if _examples_index is None:
+        _examples_index = load_or_build(examples_index_path, raw_data_path)
+    similar_issues = _examples_index.lookup(
+        top_prediction_label, application=issue.get("Application"), error_code=issue.get("Error_Code"), n=3)
 
-    if not similar_issues.empty:
+    if similar_issues:
         print("Found similar historical issues:")
-        for _, row in similar_issues.head(3).iterrows():
+        for row in similar_issues:
             print(f"  - Defect ID: {row['Defect_ID']}, Summary: {row['Summary']}")
     else:
         print("No similar historical issues found.")
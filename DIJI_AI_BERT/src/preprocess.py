@@ -4,6 +4,9 @@ import sys
 import yaml
 import os
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from examples_index.index import ExamplesIndex
+
 
 
 
@@ -46,6 +49,14 @@ def preprocess_csv(input_path, output_path):
     df_processed.to_csv(output_path, index=False)
     print(f"Preprocessed data saved to {output_path}")
 
+    # Root cause -> ranked historical defects, for the report's context section.
+    examples_path = config.get("paths", {}).get("examples_index")
+    if examples_path and "Defect_ID" in df:
+        examples_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), examples_path)
+        examples = ExamplesIndex.build(df, target_column=target_column)
+        examples.save(examples_path)
+        print(f"Examples index for {len(examples.levels['root_cause'])} root causes saved to {examples_path}")
+
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+# On-disk layout of a token cache entry (cache_dir/<key>/):
+#   tokens.npy    every ticket's token ids, concatenated (uint16 when the vocabulary fits)
+#   offsets.npy   ticket i is tokens[offsets[i]:offsets[i + 1]]
+#   targets.json  the target label of every ticket, in the same order
+# Arrays are opened with mmap_mode='r', so DataLoader workers share the pages
+# through the OS page cache.
+
+
+def load_processed_data(processed_data_path, target_column):
+    """
+    Processed tickets with a text and a target, in the row order of the cache.
+    """
+    df = pd.read_csv(processed_data_path)
+    df.dropna(subset=['text', target_column], inplace=True)
+    df[target_column] = df[target_column].astype(str)
+    return df.reset_index(drop=True)
+
+
+def token_cache_key(processed_data_path, tokenizer, max_length, target_column):
+    """
+    Fingerprint of the processed data and everything that shapes the token
+    ids: the tokenizer's full definition (vocabulary, normalizer,
+    pre-tokenizer), max_length and the target column.
+    """
+    digest = hashlib.sha256()
+    with open(processed_data_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(tokenizer.backend_tokenizer.to_str().encode('utf-8'))
+    digest.update(f"{max_length}|{target_column}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def pretokenize(processed_data_path, tokenizer, max_length, target_column, cache_dir, batch_size=10000, keep=3):
+    """
+    Tokenizes the processed data once with a fast (Rust) tokenizer in batch
+    mode and writes the result to cache_dir/<key>. Returns the entry directory;
+    an existing entry for the same key is reused. Only the keep most recently
+    used entries are kept on disk.
+    """
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError("Pre-tokenization needs a fast tokenizer, e.g. BertTokenizerFast.")
+    key = token_cache_key(processed_data_path, tokenizer, max_length, target_column)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry_dir, "targets.json")):
+        print(f"Using pre-tokenized data from {entry_dir}")
+        os.utime(entry_dir)  # marks the entry as recently used for pruning
+        return entry_dir
+
+    print("Pre-tokenizing processed data...")
+    df = load_processed_data(processed_data_path, target_column)
+    texts = df['text'].astype(str).tolist()
+
+    dtype = 'uint16' if len(tokenizer) <= np.iinfo('uint16').max + 1 else 'int32'
+    chunks, lengths = [], []
+    for start in range(0, len(texts), batch_size):
+        input_ids = tokenizer(
+            texts[start:start + batch_size],
+            add_special_tokens=True,
+            max_length=max_length,
+            truncation=True,
+            return_token_type_ids=False,
+            return_attention_mask=False,
+        )['input_ids']
+        lengths.extend(len(ids) for ids in input_ids)
+        chunks.append(np.fromiter((t for ids in input_ids for t in ids), dtype=dtype))
+        print(f"Tokenized {min(start + batch_size, len(texts))}/{len(texts)} tickets...")
+
+    offsets = np.zeros(len(lengths) + 1, dtype='int64')
+    np.cumsum(lengths, out=offsets[1:])
+
+    # Written to a temporary directory and renamed, so a partial entry is never used.
+    tmp_dir = entry_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "tokens.npy"), np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype))
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    with open(os.path.join(tmp_dir, "targets.json"), 'w') as f:
+        json.dump(df[target_column].tolist(), f)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    print(f"Cached {len(lengths)} tokenized tickets ({offsets[-1]:,} tokens) in {entry_dir}")
+    prune_cache_entries(cache_dir, keep)
+    return entry_dir
+
+
+def prune_cache_entries(cache_dir, keep):
+    """
+    Deletes all but the keep most recently used cache entries. Temporary
+    directories are left to the run that owns them.
+    """
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+               if not name.endswith(".tmp") and os.path.isdir(os.path.join(cache_dir, name))]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[keep:]:
+        print(f"Removing old token cache entry {path}")
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class TokenCache:
+    """
+    Memory-mapped view of a pre-tokenized cache entry.
+
+    The arrays are opened lazily in each process, so a TokenCache pickled
+    into DataLoader workers does not copy the token data.
+    """
+
+    def __init__(self, entry_dir):
+        self.entry_dir = entry_dir
+        with open(os.path.join(entry_dir, "targets.json"), 'r') as f:
+            self.targets = json.load(f)
+        self.offsets = np.load(os.path.join(entry_dir, "offsets.npy"))
+        self.lengths = np.diff(self.offsets)
+        self._tokens = None
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_tokens"] = None
+        return state
+
+    def input_ids(self, i):
+        if self._tokens is None:
+            self._tokens = np.load(os.path.join(self.entry_dir, "tokens.npy"), mmap_mode='r')
+        return np.asarray(self._tokens[self.offsets[i]:self.offsets[i + 1]], dtype='int64')
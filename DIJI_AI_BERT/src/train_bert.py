@@ -1,46 +1,49 @@
 import os
+import time
 import yaml
-import pandas as pd
+import sys
+import numpy as np
 import joblib
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 import torch
 from torch.utils.data import Dataset, DataLoader
 from torch.optim import AdamW
-from transformers import BertTokenizer, BertForSequenceClassification, get_linear_schedule_with_warmup
+from transformers import BertTokenizerFast, BertForSequenceClassification, get_linear_schedule_with_warmup
+
+sys.path.append(os.path.dirname(__file__))
+from batching import DynamicPaddingCollator, LengthBucketSampler, PaddingStats
+from token_cache import TokenCache, pretokenize
 
 class JiraTicketDataset(Dataset):
-    def __init__(self, texts, labels, tokenizer, max_len):
-        self.texts = texts
-        self.labels = labels
-        self.tokenizer = tokenizer
-        self.max_len = max_len
+    """
+    Tickets read from a pre-tokenized TokenCache, without padding, so the
+    sampler can bucket by length and the collator pads each batch only to
+    its longest ticket. indices selects the cache rows of this split.
+    """
+
+    def __init__(self, token_cache, indices, labels):
+        self.token_cache = token_cache
+        self.indices = np.asarray(indices)
+        self.labels = np.asarray(labels)
+        self.lengths = token_cache.lengths[self.indices]
 
     def __len__(self):
-        return len(self.texts)
+        return len(self.indices)
 
     def __getitem__(self, item):
-        text = str(self.texts[item])
-        label = self.labels[item]
-
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_len,
-            return_token_type_ids=False,
-            padding='max_length',
-            return_attention_mask=True,
-            return_tensors='pt',
-            truncation=True
-        )
-
         return {
-            'text': text,
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'labels': torch.tensor(label, dtype=torch.long)
+            'input_ids': self.token_cache.input_ids(self.indices[item]),
+            'labels': self.labels[item]
         }
 
+def split_indices(targets):
+    """
+    Train/validation row indices of the processed data. Also used by
+    optimize_bert.py to check optimized models on the same validation split.
+    """
+    return train_test_split(np.arange(len(targets)), test_size=0.1, random_state=42, stratify=targets)
+
 def train_bert():
     """
     Fine-tunes a BERT model for text classification.
@@ -65,41 +68,48 @@ def train_bert():
     LEARNING_RATE = float(params["learning_rate"])
     target_column = params["target_column"]
 
-    # --- 2. Load and Preprocess Data ---
-    print("Loading preprocessed data...")
-    df = pd.read_csv(processed_data_path)
-    df.dropna(subset=['text', target_column], inplace=True)
+    # --- 2. Pre-tokenize (cached by data and tokenizer hash) ---
+    print(f"Loading tokenizer: {MODEL_NAME}")
+    tokenizer = BertTokenizerFast.from_pretrained(MODEL_NAME)
+    cache_dir = os.path.join(project_root, paths.get("token_cache", "cache/tokens"))
+    token_cache = TokenCache(pretokenize(processed_data_path, tokenizer, MAX_LEN, target_column, cache_dir,
+                                         keep=params.get("token_cache_keep", 3)))
 
     # --- 3. Encode Labels ---
     print("Encoding labels...")
     label_encoder = LabelEncoder()
-    df['label_encoded'] = label_encoder.fit_transform(df[target_column])
+    labels_encoded = label_encoder.fit_transform(token_cache.targets)
     num_classes = len(label_encoder.classes_)
 
     # --- 4. Split Data ---
-    df_train, df_val = train_test_split(df, test_size=0.1, random_state=42, stratify=df[target_column])
-
-    # --- 5. Set up Tokenizer and Datasets ---
-    print(f"Loading tokenizer: {MODEL_NAME}")
-    tokenizer = BertTokenizer.from_pretrained(MODEL_NAME)
-
-    train_dataset = JiraTicketDataset(
-        texts=df_train.text.to_numpy(),
-        labels=df_train.label_encoded.to_numpy(),
-        tokenizer=tokenizer,
-        max_len=MAX_LEN
+    train_indices, val_indices = split_indices(token_cache.targets)
+
+    # --- 5. Set up Datasets ---
+    train_dataset = JiraTicketDataset(token_cache, train_indices, labels_encoded[train_indices])
+    val_dataset = JiraTicketDataset(token_cache, val_indices, labels_encoded[val_indices])
+
+    # Batches hold tickets of similar length and are padded only to their longest one.
+    # Workers read token ids from the memory-mapped cache and pad in parallel.
+    num_workers = params.get("num_workers", min(4, os.cpu_count() or 1))
+    loader_options = {
+        "num_workers": num_workers,
+        "persistent_workers": num_workers > 0,
+        "pin_memory": torch.cuda.is_available(),
+        "collate_fn": DynamicPaddingCollator(tokenizer.pad_token_id),
+    }
+    train_stats = PaddingStats(MAX_LEN)
+    val_stats = PaddingStats(MAX_LEN)
+    train_data_loader = DataLoader(
+        train_dataset,
+        batch_sampler=LengthBucketSampler(train_dataset.lengths, BATCH_SIZE, shuffle=True),
+        **loader_options
     )
-
-    val_dataset = JiraTicketDataset(
-        texts=df_val.text.to_numpy(),
-        labels=df_val.label_encoded.to_numpy(),
-        tokenizer=tokenizer,
-        max_len=MAX_LEN
+    val_data_loader = DataLoader(
+        val_dataset,
+        batch_sampler=LengthBucketSampler(val_dataset.lengths, BATCH_SIZE, shuffle=False),
+        **loader_options
     )
 
-    train_data_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True)
-    val_data_loader = DataLoader(val_dataset, batch_size=BATCH_SIZE)
-
     # --- 6. Build BERT Model ---
     print(f"Loading pre-trained model: {MODEL_NAME}")
     model = BertForSequenceClassification.from_pretrained(MODEL_NAME, num_labels=num_classes)
@@ -124,8 +134,12 @@ def train_bert():
 
         # --- Training Phase ---
         model.train()
+        train_stats.reset()
+        val_stats.reset()
+        epoch_start = time.perf_counter()
         total_loss = 0
         for batch in train_data_loader:
+            train_stats.add_batch(batch["attention_mask"])
             input_ids = batch["input_ids"].to(device)
             attention_mask = batch["attention_mask"].to(device)
             labels = batch["labels"].to(device)
@@ -145,6 +159,8 @@ def train_bert():
 
         avg_train_loss = total_loss / len(train_data_loader)
         print(f"Train loss: {avg_train_loss}")
+        print(f"Epoch time: {time.perf_counter() - epoch_start:.1f}s")
+        train_stats.report("Train tokens")
 
         # --- Validation Phase ---
         model.eval()
@@ -152,6 +168,7 @@ def train_bert():
         total_predictions = 0
         with torch.no_grad():
             for batch in val_data_loader:
+                val_stats.add_batch(batch["attention_mask"])
                 input_ids = batch["input_ids"].to(device)
                 attention_mask = batch["attention_mask"].to(device)
                 labels = batch["labels"].to(device)
@@ -168,6 +185,7 @@ def train_bert():
 
         val_accuracy = correct_predictions.double() / total_predictions
         print(f"Validation Accuracy: {val_accuracy:.4f}")
+        val_stats.report("Validation tokens")
 
     # --- 9. Save Artifacts ---
     print("Saving model and supporting artifacts...")
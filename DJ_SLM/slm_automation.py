@@ -6,14 +6,19 @@ import os
 import re
 import requests
 import base64
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_cache.cache import get_embedding_cache
+
 load_dotenv() # Load environment variables
 
 # Define file paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 HISTORICAL_KB_PATH = os.path.join(BASE_DIR, 'mock_historical_kb.csv')
 KEYWORD_TEAM_MAP_PATH = os.path.join(BASE_DIR, 'mock_keyword_team_map.csv')
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
 
 # Load data
 def load_data():
@@ -23,14 +28,14 @@ def load_data():
 
 # Initialize embedding model
 def initialize_embedding_model():
-    model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
     return model
 
 # Create and save FAISS index
 def create_faiss_index(historical_kb, model):
     # Combine relevant text fields for embedding
     historical_kb['combined_text'] = historical_kb['Summary'] + " " + historical_kb['Issue_Description']
-    embeddings = model.encode(historical_kb['combined_text'].tolist())
+    embeddings = get_embedding_cache(EMBEDDING_MODEL_NAME).encode(model, historical_kb['combined_text'].tolist())
     
     # FAISS index
     dimension = embeddings.shape[1]
@@ -44,7 +49,7 @@ def load_faiss_index():
     return faiss.read_index(os.path.join(BASE_DIR, 'faiss_index.bin'))
 
 def search_historical_kb(new_defect_description, model, faiss_index, historical_kb, top_k=1):
-    new_defect_embedding = model.encode([new_defect_description])
+    new_defect_embedding = get_embedding_cache(EMBEDDING_MODEL_NAME).encode(model, [new_defect_description])
     distances, indices = faiss_index.search(np.array(new_defect_embedding).astype('float32'), top_k)
     
     results = []
@@ -20,6 +20,7 @@ import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from MCP.mcp_core import Message, Context
+from embedding_cache.cache import get_embedding_cache
 
 class LogRCAAgent:
     def __init__(self, neo4j_uri="bolt://localhost:7687", neo44j_user="neo4j", neo4j_password="password", embedding_model_name='all-MiniLM-L6-v2'):
@@ -43,6 +44,7 @@ class LogRCAAgent:
 
         # Initialize SentenceTransformer model for embeddings
         self.embedding_model = SentenceTransformer(embedding_model_name)
+        self.embedding_cache = get_embedding_cache(embedding_model_name)
         self.embedding_dim = self.embedding_model.get_sentence_embedding_dimension()
 
         # Initialize FAISS index for embeddings
@@ -74,7 +76,7 @@ class LogRCAAgent:
         """
         Creates an embedding for the given text using the SentenceTransformer model.
         """
-        return self.embedding_model.encode(text).astype('float32')
+        return self.embedding_cache.encode(self.embedding_model, text)
 
     def process_logs(self, log_dir="logs"):
         """
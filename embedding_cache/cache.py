@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+
+from embedding_cache.store import LRUStore
+
+# Shared by DIJI_AI, DIJI_AI_BERT, DJ_SLM and the Log and RCA agent, so the
+# same text is never sent through the sentence encoder twice.
+DEFAULT_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".embedding_cache", "embeddings.sqlite"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    Normalizes text before hashing. Only differences the encoder cannot see
+    (Unicode composition, runs of whitespace) are removed.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", str(text))).strip()
+
+
+def canonical_model_name(model_name):
+    # SentenceTransformer resolves 'all-MiniLM-L6-v2' and
+    # 'sentence-transformers/all-MiniLM-L6-v2' to the same model.
+    prefix = "sentence-transformers/"
+    return model_name[len(prefix):] if model_name.startswith(prefix) else model_name
+
+
+class EmbeddingCache(LRUStore):
+    """
+    Persistent, size-capped LRU cache of sentence embeddings backed by SQLite.
+
+    Entries are keyed by (model name, hash of the normalized text). Vectors
+    are stored as float16 or float32 and always returned as float32.
+    """
+
+    def __init__(self, model_name, path=DEFAULT_CACHE_PATH, dtype="float32", max_bytes=DEFAULT_MAX_BYTES):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported embedding cache dtype '{dtype}'. Use 'float16' or 'float32'.")
+        self.model_name = canonical_model_name(model_name)
+        self.dtype = np.dtype(dtype)
+        super().__init__(path, "embeddings", ("dtype TEXT NOT NULL", "vector BLOB NOT NULL"), max_bytes,
+                         size_column="vector")
+
+    def _key(self, text):
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def encode(self, model, texts, **encode_kwargs):
+        """
+        Drop-in replacement for model.encode(texts) that only encodes texts
+        missing from the cache. Returns a float32 array of shape (len(texts), d).
+
+        A single string is accepted as well and returns a 1-D vector, as
+        SentenceTransformer.encode does.
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        keys = [self._key(t) for t in texts]
+
+        with self._lock:
+            cached = {key: np.frombuffer(blob, dtype=dtype).astype("float32")
+                      for key, (dtype, blob) in self._select(keys).items()}
+
+            # Encode each distinct missing text once, even if it repeats in this call.
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in cached and key not in missing:
+                    missing[key] = text
+            num_missing = sum(1 for key in keys if key not in cached)
+            self.misses += num_missing
+            self.hits += len(keys) - num_missing
+
+            now = time.time()
+            if missing:
+                vectors = np.asarray(model.encode(list(missing.values()), **encode_kwargs), dtype="float32")
+                rows = []
+                for key, vector in zip(missing, vectors):
+                    cached[key] = vector
+                    rows.append((key, self.dtype.name, vector.astype(self.dtype).tobytes(), now))
+                self._upsert(rows)
+
+            self._touch([key for key in set(keys) if key not in missing], now)
+
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+        embeddings = np.stack([cached[key] for key in keys])
+        return embeddings[0] if single else embeddings
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name, **kwargs):
+    """
+    Returns a process-wide EmbeddingCache for model_name, creating it on first use.
+    """
+    key = (canonical_model_name(model_name), kwargs.get("path", DEFAULT_CACHE_PATH), kwargs.get("dtype", "float32"))
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(model_name, **kwargs)
+        return _caches[key]
@@ -0,0 +1,56 @@
+import os
+import time
+import hashlib
+
+from embedding_cache.cache import normalize_text
+from embedding_cache.store import LRUStore
+
+# Lives next to the embedding cache, in its own table.
+DEFAULT_SCORE_CACHE_PATH = os.environ.get(
+    "PAIR_SCORE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".embedding_cache", "pair_scores.sqlite"),
+)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("PAIR_SCORE_CACHE_MAX_ENTRIES", 5_000_000))
+
+
+class PairScoreCache(LRUStore):
+    """
+    Persistent LRU cache of cross-encoder scores for (query, passage) pairs,
+    backed by SQLite.
+
+    Entries are keyed by (model name, hash of both normalized texts), so an
+    edited defect gets a fresh score while repeated queries about the same
+    incident are answered without running the model.
+    """
+
+    def __init__(self, model_name, path=DEFAULT_SCORE_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.model_name = model_name
+        super().__init__(path, "pair_scores", ("score REAL NOT NULL",), max_entries)
+
+    def key(self, query, passage):
+        digest = hashlib.sha256()
+        digest.update(normalize_text(query).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_text(passage).encode("utf-8"))
+        return f"{self.model_name}:{digest.hexdigest()}"
+
+    def get_many(self, keys):
+        """
+        Returns {key: score} for the keys that are cached.
+        """
+        with self._lock:
+            found = {key: score for key, (score,) in self._select(keys).items()}
+            self._touch(list(found), time.time())
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, scores):
+        """
+        Stores {key: score}.
+        """
+        if not scores:
+            return
+        now = time.time()
+        with self._lock:
+            self._upsert([(key, float(score), now) for key, score in scores.items()])
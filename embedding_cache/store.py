@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+
+
+class LRUStore:
+    """
+    Persistent, size-capped LRU table in SQLite, the storage behind the
+    embedding and pair-score caches.
+
+    Rows are (key, value columns..., last_used). The table is capped at
+    max_size, measured as the total LENGTH of size_column or, without one,
+    as the number of rows. The current size is kept in <table>_meta by
+    triggers, so eviction never scans the table to learn how full it is.
+
+    Methods do not lock; subclasses hold self._lock around them.
+    """
+
+    def __init__(self, path, table, columns, max_size, size_column=None):
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._value_columns = [column.split()[0] for column in columns]
+        self._measure = "bytes" if size_column else "rows"
+
+        def size(row=""):
+            return f"LENGTH({row}{size_column})" if size_column else "1"
+        self._row_size = size()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        meta, measure = f"{table}_meta", self._measure
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                               f" key TEXT PRIMARY KEY, {', '.join(columns)}, last_used REAL NOT NULL)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {meta} (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{measure}_insert AFTER INSERT ON {table} BEGIN"
+                f" UPDATE {meta} SET value = value + {size('NEW.')} WHERE name = '{measure}'; END")
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{measure}_delete AFTER DELETE ON {table} BEGIN"
+                f" UPDATE {meta} SET value = value - {size('OLD.')} WHERE name = '{measure}'; END")
+            if size_column:
+                self._conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_{measure}_update AFTER UPDATE OF {size_column} ON {table}"
+                    f" BEGIN UPDATE {meta} SET value = value + {size('NEW.')} - {size('OLD.')}"
+                    f" WHERE name = '{measure}'; END")
+            # Seeded once, after the triggers exist, for tables created before the size was kept.
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO {meta} SELECT '{measure}', COALESCE(SUM({size()}), 0) FROM {table}")
+
+    def _select(self, keys):
+        """
+        Returns {key: (value columns...)} for the keys that are stored.
+        """
+        found = {}
+        # SQLite limits the number of bound parameters per statement.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._conn.execute(
+                    f"SELECT key, {', '.join(self._value_columns)} FROM {self.table} WHERE key IN ({placeholders})",
+                    chunk):
+                found[row[0]] = row[1:]
+        return found
+
+    def _touch(self, keys, now):
+        if keys:
+            with self._conn:
+                self._conn.executemany(f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in keys])
+
+    def _upsert(self, rows):
+        """
+        Stores rows of (key, value columns..., last_used), then evicts.
+        """
+        updates = ", ".join(f"{column} = excluded.{column}" for column in self._value_columns + ["last_used"])
+        placeholders = ", ".join("?" * (len(self._value_columns) + 2))
+        with self._conn:
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes without firing the size trigger.
+            self._conn.executemany(
+                f"INSERT INTO {self.table} VALUES ({placeholders}) ON CONFLICT(key) DO UPDATE SET {updates}", rows)
+        self._evict()
+
+    def _evict(self):
+        """
+        Drops least recently used entries until the table is under max_size.
+        """
+        total = self._conn.execute(f"SELECT value FROM {self.table}_meta WHERE name = ?",
+                                   (self._measure,)).fetchone()[0]
+        if total <= self.max_size:
+            return
+        # Evict down to 90% of the cap so the next few inserts don't evict again.
+        excess = total - int(self.max_size * 0.9)
+        doomed = []
+        for key, size in self._conn.execute(f"SELECT key, {self._row_size} FROM {self.table} ORDER BY last_used"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        with self._conn:
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0],
+        }
+
+    def close(self):
+        self._conn.close()
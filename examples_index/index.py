@@ -0,0 +1,168 @@
+import os
+import json
+import argparse
+import pandas as pd
+
+# Shared by DIJI_AI and DIJI_AI_BERT: maps a root cause (optionally narrowed
+# by application or error code) to its most recent historical defects, so
+# "similar historical issues" is a dict lookup instead of a CSV scan.
+
+# Lookup levels, most specific first. Each maps a key built from the listed
+# columns to a ranked list of example defects.
+LEVELS = {
+    "root_cause+application": ("Root_Cause", "Application"),
+    "root_cause+error_code": ("Root_Cause", "Error_Code"),
+    "root_cause": ("Root_Cause",),
+}
+EXAMPLE_COLUMNS = ("Defect_ID", "Summary", "Root_Cause", "Application", "Error_Code", "Severity")
+KEY_SEP = "\x1f"
+
+
+def _normalize(value):
+    """
+    Key form of a field value: "" for missing, and 503.0 -> "503" so that an
+    Error_Code read as float matches the one in a Jira issue.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip().lower()
+
+
+def _key(values):
+    return KEY_SEP.join(_normalize(v) for v in values)
+
+
+class ExamplesIndex:
+    """
+    Root cause -> ranked example defects, most recent first.
+
+    Rows later in the data (or newer by rank_column) count as more recent.
+    Only the per_key best examples are kept for each key.
+    """
+
+    def __init__(self, per_key=10, levels=None, examples=None):
+        self.per_key = per_key
+        self.levels = levels if levels is not None else {name: {} for name in LEVELS}
+        # Defect_ID -> example row, for every defect held in some list.
+        self.examples = examples if examples is not None else {}
+
+    @classmethod
+    def build(cls, df, per_key=10, rank_column=None, target_column="Root_Cause"):
+        index = cls(per_key=per_key)
+        index.update(df, rank_column=rank_column, target_column=target_column)
+        return index
+
+    def update(self, df, rank_column=None, target_column="Root_Cause"):
+        """
+        Merges newly closed (or re-exported) defects into the index.
+
+        A defect already in the index is first removed from its old lists, so a
+        changed root cause moves it. Lists that lose an entry this way are not
+        backfilled with older defects until the next full build.
+        """
+        if target_column != "Root_Cause" and target_column in df:
+            df = df.rename(columns={target_column: "Root_Cause"})
+        if "Defect_ID" not in df or "Root_Cause" not in df:
+            raise ValueError("Examples index needs 'Defect_ID' and the target column.")
+        df = df[df["Root_Cause"].notna()]
+        if rank_column:
+            df = df.sort_values(rank_column, kind="stable")
+        # Newest first; a Defect_ID repeated in the data keeps its last row.
+        df = df.iloc[::-1].drop_duplicates(subset="Defect_ID", keep="first")
+        df = df.assign(_id=df["Defect_ID"].map(str))
+
+        updated = set(df["_id"])
+        for lists in self.levels.values():
+            for key, ids in lists.items():
+                if any(i in updated for i in ids):
+                    lists[key] = [i for i in ids if i not in updated]
+
+        columns = [c for c in EXAMPLE_COLUMNS if c in df]
+        for level, level_columns in LEVELS.items():
+            if not all(c in df for c in level_columns):
+                continue
+            lists = self.levels[level]
+            keys = df[level_columns[0]].map(_normalize)
+            for column in level_columns[1:]:
+                keys = keys + KEY_SEP + df[column].map(_normalize)
+            # Only the newest per_key defects of each key can make it into the list.
+            newest = df.assign(_key=keys).groupby("_key", sort=False).head(self.per_key)
+            for key, group in newest.groupby("_key", sort=False):
+                ids = group["_id"].tolist()
+                lists[key] = (ids + [i for i in lists.get(key, []) if i not in ids])[:self.per_key]
+                records = group[columns].astype(object).where(group[columns].notna(), "").to_dict('records')
+                self.examples.update(zip(ids, records))
+
+        # Drop example rows no list refers to any more.
+        referenced = {i for lists in self.levels.values() for ids in lists.values() for i in ids}
+        self.examples = {i: row for i, row in self.examples.items() if i in referenced}
+        return self
+
+    def lookup(self, root_cause, application=None, error_code=None, n=3):
+        """
+        Returns up to n example defects (dicts) for the root cause, preferring
+        ones from the same application, then the same error code.
+        """
+        candidates = []
+        if application is not None:
+            candidates.append(("root_cause+application", (root_cause, application)))
+        if error_code is not None:
+            candidates.append(("root_cause+error_code", (root_cause, error_code)))
+        candidates.append(("root_cause", (root_cause,)))
+
+        results, seen = [], set()
+        for level, values in candidates:
+            for defect_id in self.levels.get(level, {}).get(_key(values), []):
+                if defect_id not in seen:
+                    seen.add(defect_id)
+                    results.append(self.examples[defect_id])
+                    if len(results) >= n:
+                        return results
+        return results
+
+    def lookup_frame(self, root_cause, application=None, error_code=None, n=3):
+        return pd.DataFrame(self.lookup(root_cause, application, error_code, n), columns=list(EXAMPLE_COLUMNS))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"per_key": self.per_key, "levels": self.levels, "examples": self.examples}, f, default=str)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        levels = {name: {} for name in LEVELS}
+        levels.update(data["levels"])
+        return cls(per_key=data["per_key"], levels=levels, examples=data["examples"])
+
+
+def load_or_build(path, raw_data_path, per_key=10, target_column="Root_Cause"):
+    """
+    Loads the persisted index, building it from the raw data when it is missing.
+    """
+    if os.path.exists(path):
+        return ExamplesIndex.load(path)
+    print(f"Examples index not found, building it from {raw_data_path}...")
+    index = ExamplesIndex.build(pd.read_csv(raw_data_path), per_key=per_key, target_column=target_column)
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the root-cause examples index with newly closed defects.")
+    parser.add_argument("index", help="Path of the persisted index (JSON).")
+    parser.add_argument("new_defects", help="CSV with the new or re-exported defects.")
+    parser.add_argument("--target-column", default="Root_Cause")
+    parser.add_argument("--rank-column", help="Column ordering defects by recency, e.g. a close date.")
+    args = parser.parse_args()
+
+    index = ExamplesIndex.load(args.index)
+    index.update(pd.read_csv(args.new_defects), rank_column=args.rank_column, target_column=args.target_column)
+    index.save(args.index)
+    print(f"Examples index updated: {len(index.examples)} example defects across "
+          f"{len(index.levels['root_cause'])} root causes.")